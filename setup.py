@@ -5,10 +5,19 @@ setup(
     version="0.1.0",
     package_dir={"": "src"},  # Tell setuptools packages are under src
     packages=find_packages(where="src"),  # Find packages under src
+    package_data={"calendargen": ["bench_baseline.json"]},
     install_requires=[
         'reportlab>=4.0.0',
         'flask>=3.0.0',
         'werkzeug>=3.0.0',
     ],
+    entry_points={
+        'console_scripts': [
+            'calendargen=calendargen.cli:main',
+        ],
+    },
+    extras_require={
+        'parallel': ['pypdf>=3.0.0'],
+    },
     python_requires='>=3.8',
 )
\ No newline at end of file
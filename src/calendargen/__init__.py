@@ -1,3 +1,43 @@
-from .generator import generate_calendar, DynamicCalendarGenerator as CalendarGenerator
+import importlib
 
-__version__ = '0.1.0'
\ No newline at end of file
+__version__ = '0.1.0'
+
+# Public names and the submodules defining them. They are imported on
+# first use, so importing a light submodule (cache, instrument) or just
+# the package does not load reportlab.
+_EXPORTS = {
+    'generate_calendar': ('generator', 'generate_calendar'),
+    'generate_range': ('generator', 'generate_range'),
+    'render_calendar_bytes': ('generator', 'render_calendar_bytes'),
+    'month_span': ('generator', 'month_span'),
+    'CalendarGenerator': ('generator', 'DynamicCalendarGenerator'),
+    'RenderCache': ('cache', 'RenderCache'),
+    'make_render_key': ('cache', 'make_render_key'),
+    'make_page_key': ('cache', 'make_page_key'),
+    'make_event_set_key': ('cache', 'make_event_set_key'),
+    'Event': ('events', 'Event'),
+    'EventLoadError': ('events', 'EventLoadError'),
+    'EventLimitError': ('events', 'EventLimitError'),
+    'iter_events': ('events', 'iter_events'),
+    'get_holidays': ('holidays', 'get_holidays'),
+    'get_holidays_range': ('holidays', 'get_holidays_range'),
+    'register_country': ('holidays', 'register_country'),
+    'render_month_svg': ('preview', 'render_month_svg'),
+    'warm_up': ('warmup', 'warm_up'),
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    try:
+        module_name, attr = _EXPORTS[name]
+    except KeyError:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    value = getattr(importlib.import_module(f'.{module_name}', __name__), attr)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
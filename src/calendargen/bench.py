@@ -0,0 +1,386 @@
+import csv
+import importlib.util
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import date, timedelta
+
+from reportlab.lib.units import mm
+
+from .cache import RenderCache
+from .generator import DynamicCalendarGenerator, COLOR_SCHEMES
+from .output import OUTPUT_PROFILES
+from .parallel import have_pypdf
+
+# Synthetic event set shapes
+PROFILES = ('sparse', 'dense', 'many_per_day')
+
+LOAD_SIZES = (1000, 10000, 100000)
+QUICK_LOAD_SIZES = (1000, 10000)
+
+PAPER_SIZES = ('A4', 'LETTER', 'LEGAL')
+ORIENTATIONS = ('P', 'L')
+
+STAGES = ('load', 'sizing', 'table', 'build', 'engine', 'profile', 'web', 'startup')
+
+ENGINES = ('platypus', 'canvas')
+
+BENCH_YEAR = 2024
+
+# Reference timings of `calendargen bench --quick`, compared against by
+# default. The machine it was recorded on is stored under "profile", and
+# the threshold is only enforced on a machine with the same profile;
+# elsewhere record a baseline per machine with --save-baseline.
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_baseline.json')
+
+# Profile fields that must match a baseline's for its threshold to apply
+PROFILE_KEYS = ('python', 'system', 'machine', 'cpus', 'reportlab', 'pypdf')
+
+# Benchmarks faster than this (seconds) are reported but never fail a run,
+# since timer noise alone can exceed the threshold
+MIN_ENFORCED_SECONDS = 0.001
+
+
+def synthetic_rows(profile, rows, year=BENCH_YEAR, seed=0):
+    """Yield reproducible event row dicts for a synthetic profile.
+
+    sparse: dated events spread over several decades plus a few recurring
+    ones, so most rows fall outside any one year.
+    dense: every day of year gets events, with some recurring rows.
+    many_per_day: all rows land on a handful of days.
+    """
+    rng = random.Random(seed)
+    types = ('other', 'birthday', 'anniversary', 'holiday')
+    first_day = date(year, 1, 1)
+    days_in_year = (date(year + 1, 1, 1) - first_day).days
+    hot_days = [first_day + timedelta(days=rng.randrange(days_in_year)) for _ in range(8)]
+
+    for i in range(rows):
+        if profile == 'sparse':
+            if rng.random() < 0.05:
+                date_str = f'{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}'
+            else:
+                date_str = date(rng.randint(year - 30, year + 30), rng.randint(1, 12), rng.randint(1, 28)).isoformat()
+        elif profile == 'dense':
+            if rng.random() < 0.1:
+                date_str = f'{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}'
+            else:
+                date_str = (first_day + timedelta(days=i % days_in_year)).isoformat()
+        elif profile == 'many_per_day':
+            date_str = rng.choice(hot_days).isoformat()
+        else:
+            raise ValueError(f'Unknown profile {profile!r}')
+        yield {'date': date_str, 'event': f'Event {i}', 'type': rng.choice(types)}
+
+
+def synthetic_csv(profile, rows, year=BENCH_YEAR, seed=0):
+    """Synthetic events as CSV text"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=('date', 'event', 'type'))
+    writer.writeheader()
+    writer.writerows(synthetic_rows(profile, rows, year, seed))
+    return buffer.getvalue()
+
+
+def timeit(func, repeat):
+    """Median wall time of func over repeat runs"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def _loaded_generator(profile, rows, styling=None):
+    calendar_gen = DynamicCalendarGenerator(styling or {'holidays': 'us'})
+    calendar_gen.load_events(io.StringIO(synthetic_csv(profile, rows)), years=(BENCH_YEAR,))
+    calendar_gen.load_holidays(BENCH_YEAR)
+    calendar_gen.build_event_index(BENCH_YEAR)
+    return calendar_gen
+
+
+def bench_load(results, repeat, quick):
+    for profile in PROFILES:
+        for rows in (QUICK_LOAD_SIZES if quick else LOAD_SIZES):
+            text = synthetic_csv(profile, rows)
+
+            def run():
+                DynamicCalendarGenerator().load_events(io.StringIO(text), years=(BENCH_YEAR,))
+            results[f'load/{profile}/{rows}'] = timeit(run, repeat)
+
+
+def bench_sizing(results, repeat, quick):
+    for profile in PROFILES:
+        calendar_gen = _loaded_generator(profile, 10000)
+        doc = calendar_gen.create_document(io.BytesIO())
+        available_height = calendar_gen.page_size[1] - (doc.topMargin + doc.bottomMargin + 30*mm)
+
+        def run():
+            for month in range(1, 13):
+                calendar_gen.calculate_optimal_sizes(BENCH_YEAR, month, available_height)
+        results[f'sizing/{profile}'] = timeit(run, repeat)
+
+
+def bench_table(results, repeat, quick):
+    for profile in PROFILES:
+        calendar_gen = _loaded_generator(profile, 10000)
+
+        def run():
+            for month in range(1, 13):
+                calendar_gen.create_month_table(BENCH_YEAR, month, 20, 9)
+        results[f'table/{profile}'] = timeit(run, repeat)
+
+
+def bench_build(results, repeat, quick):
+    paper_sizes = PAPER_SIZES[:1] if quick else PAPER_SIZES
+    for scheme in COLOR_SCHEMES:
+        for paper_size in paper_sizes:
+            for orientation in ORIENTATIONS:
+                styling = {
+                    'color_scheme': scheme,
+                    'paper_size': paper_size,
+                    'orientation': orientation,
+                    'holidays': 'us',
+                }
+                calendar_gen = _loaded_generator('dense', 2000, styling)
+
+                def run():
+                    calendar_gen.generate_calendar(BENCH_YEAR, io.BytesIO())
+                results[f'build/{scheme}/{paper_size}/{orientation}'] = timeit(run, repeat)
+
+
+def bench_engine(results, repeat, quick):
+    """Full-year render time of each engine on the same events"""
+    for profile in PROFILES:
+        timings = {}
+        for engine in ENGINES:
+            calendar_gen = _loaded_generator(profile, 10000, {'holidays': 'us', 'engine': engine})
+
+            def run():
+                calendar_gen.generate_calendar(BENCH_YEAR, io.BytesIO())
+            timings[engine] = results[f'engine/{engine}/{profile}'] = timeit(run, repeat)
+        print(f'canvas engine speedup ({profile}): {timings["platypus"] / timings["canvas"]:.1f}x', file=sys.stderr)
+
+
+def bench_profile(results, repeat, quick):
+    """Render time and output size of each output profile.
+
+    Times are recorded as results; sizes are printed, since they only
+    change when the output does. 'assembled' merges pages from a warm page
+    cache, where the small profile's object dedupe applies.
+    """
+    variants = [(engine, False) for engine in ENGINES]
+    if have_pypdf():
+        variants.append(('platypus', True))
+    for engine, assembled in variants:
+        name = 'assembled' if assembled else engine
+        for profile in OUTPUT_PROFILES:
+            styling = {'holidays': 'us', 'engine': engine, 'output_profile': profile}
+            calendar_gen = _loaded_generator('dense', 2000, styling)
+            page_cache = RenderCache(max_entries=12) if assembled else None
+            sizes = []
+
+            def run():
+                buffer = io.BytesIO()
+                calendar_gen.generate_calendar(BENCH_YEAR, buffer, page_cache=page_cache)
+                sizes.append(len(buffer.getvalue()))
+            if assembled:
+                run()
+            seconds = results[f'profile/{name}/{profile}'] = timeit(run, repeat)
+            print(f'{name}/{profile} output: {sizes[-1]} bytes in {seconds * 1000:.2f} ms', file=sys.stderr)
+
+
+def bench_web(results, repeat, quick):
+    """End-to-end POST / through the Flask test client"""
+    try:
+        from src.webapp.app import app, page_cache, render_cache
+    except ImportError:
+        print('Skipping web stage: run from the repository root to import src.webapp', file=sys.stderr)
+        return
+
+    client = app.test_client()
+    form = {
+        'year': str(BENCH_YEAR),
+        'csv_text': synthetic_csv('dense', 500),
+        'holidays': 'us',
+        'color_scheme': 'minimal',
+    }
+    requests = 3 if quick else 10
+
+    def post():
+        response = client.post('/', data=form)
+        if response.status_code != 200:
+            raise RuntimeError(f'POST / returned {response.status_code}')
+
+    def clear_caches():
+        render_cache.clear()
+        if page_cache is not None:
+            page_cache.clear()
+
+    def uncached():
+        for _ in range(requests):
+            clear_caches()
+            post()
+    results['web/post'] = timeit(uncached, repeat) / requests
+
+    clear_caches()
+    post()
+    results['web/post_cached'] = timeit(lambda: [post() for _ in range(requests)], repeat) / requests
+
+
+# Run in a fresh interpreter: app import, first /health, then two uncached renders
+STARTUP_SCRIPT = """
+import json, time
+start = time.perf_counter()
+from src.webapp.app import app
+timings = {'import': time.perf_counter() - start}
+client = app.test_client()
+start = time.perf_counter()
+client.get('/health')
+timings['health'] = time.perf_counter() - start
+for name, year in (('first_request', 2024), ('next_request', 2025)):
+    start = time.perf_counter()
+    client.post('/', data={'year': str(year), 'csv_text': 'date,event,type\\n01-05,Party,other\\n', 'holidays': 'us'})
+    timings[name] = time.perf_counter() - start
+print(json.dumps(timings))
+"""
+
+
+def bench_startup(results, repeat, quick):
+    """Web app cold start in fresh processes, without and with WARMUP=1.
+
+    With warm-up the import includes it, as it would in a gunicorn
+    --preload master, and first_request shows what a forked worker sees.
+    """
+    if importlib.util.find_spec('src.webapp') is None:
+        print('Skipping startup stage: run from the repository root to import src.webapp', file=sys.stderr)
+        return
+
+    for label, warmup in (('cold', '0'), ('warm', '1')):
+        samples = []
+        for _ in range(repeat):
+            output = subprocess.run([sys.executable, '-c', STARTUP_SCRIPT], env=dict(os.environ, WARMUP=warmup),
+                                    capture_output=True, text=True, check=True).stdout
+            samples.append(json.loads(output.strip().splitlines()[-1]))
+        for name in samples[0]:
+            results[f'startup/{label}/{name}'] = statistics.median(sample[name] for sample in samples)
+
+
+STAGE_FUNCTIONS = {
+    'load': bench_load,
+    'sizing': bench_sizing,
+    'table': bench_table,
+    'build': bench_build,
+    'engine': bench_engine,
+    'profile': bench_profile,
+    'web': bench_web,
+    'startup': bench_startup,
+}
+
+
+def run_benchmarks(stages=STAGES, repeat=5, quick=False):
+    """Run the selected stages and return {benchmark name: median seconds}"""
+    results = {}
+    for stage in stages:
+        STAGE_FUNCTIONS[stage](results, repeat, quick)
+    return results
+
+
+def machine_profile(quick, repeat):
+    """Describe where and how results were measured, saved with baselines"""
+    import reportlab
+
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'system': platform.system(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'reportlab': reportlab.Version,
+        'pypdf': have_pypdf(),
+        'quick': quick,
+        'repeat': repeat,
+    }
+
+
+def load_baseline(path):
+    """Return (profile, timings) from a baseline file.
+
+    Files saved before profiles were recorded hold the timings only.
+    """
+    with open(path) as f:
+        data = json.load(f)
+    if 'results' in data:
+        return data.get('profile', {}), data['results']
+    return {}, data
+
+
+def profile_differences(baseline_profile, profile):
+    """Profile fields recorded in a baseline that differ from this machine's"""
+    return sorted(key for key in PROFILE_KEYS
+                  if key in baseline_profile and baseline_profile[key] != profile[key])
+
+
+def compare(results, baseline, threshold):
+    """Return [(name, baseline, current)] for benchmarks slower than allowed"""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous and previous >= MIN_ENFORCED_SECONDS and current > previous * (1 + threshold):
+            regressions.append((name, previous, current))
+    return regressions
+
+
+def main(args, out=sys.stdout):
+    stages = args.stages.split(',') if args.stages else STAGES
+    for stage in stages:
+        if stage not in STAGE_FUNCTIONS:
+            raise SystemExit(f'Unknown stage {stage!r}, choose from {", ".join(STAGE_FUNCTIONS)}')
+
+    results = run_benchmarks(stages, repeat=args.repeat, quick=args.quick)
+
+    profile = machine_profile(args.quick, args.repeat)
+    baseline_path = args.baseline
+    if baseline_path is None and args.quick:
+        baseline_path = DEFAULT_BASELINE
+    baseline = {}
+    enforce = True
+    if baseline_path and baseline_path != 'none':
+        baseline_profile, baseline = load_baseline(baseline_path)
+        if baseline_profile.get('quick', args.quick) != args.quick:
+            print(f'Ignoring {baseline_path}: recorded with quick={baseline_profile["quick"]}', file=out)
+            baseline = {}
+        else:
+            differs = profile_differences(baseline_profile, profile)
+            if differs:
+                enforce = False
+                print(f'Note: {baseline_path} was recorded on a different machine '
+                      f'({", ".join(f"{key}={baseline_profile[key]}" for key in differs)}), '
+                      f'so the threshold is not enforced', file=out)
+
+    for name, seconds in results.items():
+        line = f'{name:<40} {seconds * 1000:10.2f} ms'
+        if name in baseline:
+            change = (seconds / baseline[name] - 1) * 100
+            line += f'  ({change:+.1f}% vs baseline)'
+        print(line, file=out)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump({'profile': profile, 'results': results}, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f'Saved baseline to {args.save_baseline}', file=out)
+
+    if not enforce:
+        return 0
+    regressions = compare(results, baseline, args.threshold)
+    for name, previous, current in regressions:
+        print(f'REGRESSION {name}: {previous * 1000:.2f} ms -> {current * 1000:.2f} ms', file=out)
+    return 1 if regressions else 0
@@ -0,0 +1,263 @@
+import calendar
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from datetime import date
+
+# Bump when the rendered output for the same inputs changes
+CACHE_FORMAT_VERSION = 1
+
+
+def _normalize(value):
+    """Convert styling values to a JSON-stable form"""
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in sorted(value.items(), key=lambda item: str(item[0]))}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    if isinstance(value, (bool, int, float)) or value is None:
+        return value
+    return str(value)
+
+
+def _event_lists(recurring_events, specific_events):
+    recurring = [
+        [month, day, [[e['description'], e['type']] for e in events]]
+        for month in sorted(recurring_events)
+        for day, events in sorted(recurring_events[month].items())
+    ]
+    specific = [
+        [event_date.isoformat(), [[e['description'], e['type']] for e in events]]
+        for event_date, events in sorted(specific_events.items())
+    ]
+    return recurring, specific
+
+
+def _rule_lists(rule_events):
+    # Insertion order is kept: it is the order the events appear in a cell
+    return [
+        [recurrence.start.isoformat(), recurrence.rule, [[e['description'], e['type']] for e in events]]
+        for recurrence, events in rule_events.items()
+    ]
+
+
+def _hash_payload(payload):
+    encoded = json.dumps(payload, sort_keys=True, separators=(',', ':')).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def make_render_key(year, styling, recurring_events, specific_events, pages=None, rule_events=None):
+    """Stable content hash for one rendered calendar.
+
+    Covers the year, the normalized styling dict (which carries the holiday
+    country) and the parsed event set, so the same inputs always map to the
+    same key regardless of dict ordering or how the CSV was supplied. pages
+    lists the (year, month) pages when rendering anything but the full year.
+    rule_events maps recurrence rules to their events.
+    """
+    styling = styling or {}
+    recurring, specific = _event_lists(recurring_events, specific_events)
+    payload = {
+        'version': CACHE_FORMAT_VERSION,
+        'year': int(year),
+        'styling': _normalize(styling),
+        'holidays': str(styling.get('holidays', 'none')),
+        'recurring': recurring,
+        'specific': specific,
+    }
+    if pages is not None:
+        payload['pages'] = [[int(y), int(m)] for y, m in pages]
+    if rule_events:
+        payload['rules'] = _rule_lists(rule_events)
+    return _hash_payload(payload)
+
+
+def make_page_key(year, month, styling, recurring_events, specific_events, rule_events=None):
+    """Content hash for a single month page.
+
+    Only the events that can appear on that page are hashed (recurrence
+    rules by their occurrences in the month), so editing one month leaves
+    the keys of every other month unchanged.
+    """
+    styling = styling or {}
+    recurring = {month: recurring_events[month]} if month in recurring_events else {}
+    specific = {d: events for d, events in specific_events.items()
+                if d.year == year and d.month == month}
+    recurring, specific = _event_lists(recurring, specific)
+    payload = {
+        'version': CACHE_FORMAT_VERSION,
+        'page': [int(year), int(month)],
+        'styling': _normalize(styling),
+        'holidays': str(styling.get('holidays', 'none')),
+        'recurring': recurring,
+        'specific': specific,
+    }
+    if rule_events:
+        first = date(year, month, 1)
+        last = date(year, month, calendar.monthrange(year, month)[1])
+        occurrences = []
+        for recurrence, events in rule_events.items():
+            days = [d.day for d in recurrence.between(first, last)]
+            if days:
+                occurrences.append([days, [[e['description'], e['type']] for e in events]])
+        if occurrences:
+            payload['rules'] = occurrences
+    return _hash_payload(payload)
+
+
+def make_event_set_key(set_id, version, year, styling, pages=None):
+    """Render key for a stored event set, identified by id and version.
+
+    The version changes with every edit to the set, so the events need not
+    be read or hashed to key a render of them.
+    """
+    styling = styling or {}
+    payload = {
+        'version': CACHE_FORMAT_VERSION,
+        'year': int(year),
+        'styling': _normalize(styling),
+        'holidays': str(styling.get('holidays', 'none')),
+        'event_set': [str(set_id), int(version)],
+    }
+    if pages is not None:
+        payload['pages'] = [[int(y), int(m)] for y, m in pages]
+    return _hash_payload(payload)
+
+
+class RenderCache:
+    """Two-tier cache of rendered PDF bytes.
+
+    The memory tier is an LRU bounded by entry count and total bytes. The
+    optional disk tier stores one file per key under disk_dir and evicts the
+    least recently used files once disk_max_bytes is exceeded.
+    """
+
+    def __init__(self, max_entries=64, max_bytes=64 * 1024 * 1024,
+                 disk_dir=None, disk_max_bytes=512 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_evictions = 0
+
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+    def get(self, key):
+        """Return cached bytes for key, or None"""
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return data
+
+        data = self._disk_get(key)
+        with self._lock:
+            if data is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._memory_put(key, data)
+        return data
+
+    def put(self, key, data):
+        """Store rendered bytes under key in every configured tier"""
+        with self._lock:
+            self._memory_put(key, data)
+        self._disk_put(key, data)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Counters for sizing the cache"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'disk_evictions': self.disk_evictions,
+                'disk_enabled': bool(self.disk_dir),
+            }
+
+    def _memory_put(self, key, data):
+        # Caller holds the lock
+        if len(data) > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= len(old)
+        self._entries[key] = data
+        self._bytes += len(data)
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+            self.evictions += 1
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, f'{key}.pdf')
+
+    def _disk_get(self, key):
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            # Touch so size-based eviction drops the least recently used files
+            os.utime(path)
+        except OSError:
+            return None
+        return data
+
+    def _disk_put(self, key, data):
+        if not self.disk_dir or len(data) > self.disk_max_bytes:
+            return
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.disk_dir, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, self._disk_path(key))
+        except OSError:
+            return
+        self._disk_evict()
+
+    def _disk_evict(self):
+        files = []
+        total = 0
+        try:
+            for entry in os.scandir(self.disk_dir):
+                if entry.name.endswith('.pdf'):
+                    st = entry.stat()
+                    files.append((st.st_mtime, st.st_size, entry.path))
+                    total += st.st_size
+        except OSError:
+            return
+        files.sort()
+        for _, size, path in files:
+            if total <= self.disk_max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            with self._lock:
+                self.disk_evictions += 1
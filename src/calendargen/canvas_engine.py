@@ -0,0 +1,333 @@
+import calendar as cal
+import hashlib
+from functools import lru_cache
+
+from reportlab import Version as REPORTLAB_VERSION
+from reportlab.lib import colors
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.lib.units import mm
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.platypus.paraparser import ParaParser
+
+from .instrument import timed
+
+# Layout constants mirrored from the platypus engine so both engines place
+# text at the same coordinates
+FRAME_PADDING = 6           # SimpleDocTemplate frame padding
+PAGE_HEADER_LEADING = 12    # PageHeader style keeps the default leading
+PAGE_HEADER_SPACE_AFTER = 20
+DAY_NUMBER_LEADING = 12     # DayNumber style keeps the default leading
+EVENT_SPACING = 2           # EventText spaceBefore and spaceAfter
+MAX_EVENTS_PER_DAY = 3
+SPACE_SHRINKAGE = 0.05      # reportlab's default allowed space shrinkage
+
+# reportlab 4.3 stopped opening a split word with an empty line when its
+# first character is wider than the whole line
+SKIP_EMPTY_SPLIT = tuple(int(part) for part in REPORTLAB_VERSION.split('.')[:2]) >= (4, 3)
+
+# Distinct event descriptions whose markup is kept parsed
+MARKUP_CACHE_SIZE = 4096
+
+# Distinct grid configurations whose static layers are kept in memory
+STATIC_LAYER_CACHE_SIZE = 256
+
+
+def wrap_text(text, font_name, font_size, max_width):
+    """Break text into lines the way platypus Paragraph does by default.
+
+    Lines are filled greedily, allowing each space to shrink slightly, and
+    words wider than the line are split character by character.
+    """
+    space_width = stringWidth(' ', font_name, font_size)
+    shrink = SPACE_SHRINKAGE * space_width
+    lines = []
+    line = []
+    width = -space_width
+    for word in text.split():
+        word_width = stringWidth(word, font_name, font_size)
+        if word_width <= max_width:
+            new_width = width + space_width + word_width
+            if not line or new_width <= max_width + shrink * len(line):
+                line.append(word)
+                width = new_width
+            else:
+                lines.append(' '.join(line))
+                line = [word]
+                width = word_width
+            continue
+
+        # Long word: fill the rest of this line, then continue on new lines
+        line_width = width + space_width
+        piece = ''
+        for char in word:
+            char_width = stringWidth(char, font_name, font_size)
+            if line_width + char_width > max_width and (piece or char_width <= max_width
+                                                        or not SKIP_EMPTY_SPLIT):
+                line.append(piece)
+                lines.append(' '.join(p for p in line if p))
+                line = []
+                piece = ''
+                line_width = 0
+            piece += char
+            line_width += char_width
+        line.append(piece)
+        width = line_width
+    if line:
+        lines.append(' '.join(line))
+    return lines
+
+
+@lru_cache(maxsize=MARKUP_CACHE_SIZE)
+def paragraph_text(description):
+    """Plain text of a description as platypus Paragraph reads its markup.
+
+    Returns a tuple of segments, one per line started by <br/>. Tags are
+    dropped, since the canvas engine draws events in a single font, and
+    entities such as &amp; are decoded. Markup that Paragraph rejects
+    raises ValueError here too.
+    """
+    if '<' not in description and '&' not in description:
+        return (description,)
+    style, frags, _ = ParaParser().parse(description, ParagraphStyle('plain'))
+    if frags is None:
+        raise ValueError(f'invalid markup in event description {description!r}')
+    segments = ['']
+    for frag in frags:
+        if getattr(frag, 'lineBreak', False):
+            segments.append('')
+        else:
+            segments[-1] += frag.text
+    # A trailing <br/> ends the last line without starting another
+    if len(segments) > 1 and not segments[-1]:
+        segments.pop()
+    return tuple(segments)
+
+
+def description_lines(description, font_name, font_size, max_width):
+    """Lines of an event description as a Paragraph of the same width lays them out"""
+    segments = paragraph_text(description)
+    # An empty description takes no lines, like an empty Paragraph
+    if not any(segment.strip() for segment in segments):
+        return []
+    return [line for segment in segments
+            for line in wrap_text(segment, font_name, font_size, max_width) or ['']]
+
+
+class GridGeometry:
+    """Column and row positions for a month grid with a given number of weeks"""
+
+    def __init__(self, left, top, col_width, row_heights):
+        self.col_x = [left + col_width * i for i in range(8)]
+        self.row_y = [top]
+        for height in row_heights:
+            self.row_y.append(self.row_y[-1] - height)
+        self.left = left
+        self.top = top
+        self.width = col_width * 7
+        self.height = sum(row_heights)
+        self.bottom = top - self.height
+
+
+class CanvasRenderer:
+    """Draws month pages directly on a reportlab canvas.
+
+    Grid geometry is computed once per week count and reused for every
+    month; cell text is laid out with simple line splitting instead of the
+    platypus paragraph parser and table layout.
+    """
+
+    def __init__(self, calendar_gen):
+        self.gen = calendar_gen
+        self.page_width, self.page_height = calendar_gen.page_size
+
+        # Margins come from the same document template the platypus engine uses
+        doc = calendar_gen.create_document(None)
+        self.left = doc.leftMargin
+        self.available_height = self.page_height - (doc.topMargin + doc.bottomMargin + 30*mm)
+        self.col_width = (self.page_width - (doc.leftMargin + doc.rightMargin)) / 7
+        frame_top = self.page_height - doc.topMargin - FRAME_PADDING
+        self.header_top = frame_top
+        self.table_top = frame_top - PAGE_HEADER_LEADING - PAGE_HEADER_SPACE_AFTER
+
+        scheme = calendar_gen.colors
+        self.color = {name: colors.HexColor(value) for name, value in scheme.items()}
+
+        # Columns that fall on Saturday or Sunday for this week start
+        self.weekend_columns = [
+            col for col in range(7) if (calendar_gen.week_start + col) % 7 in (5, 6)
+        ]
+        self._geometry = {}
+        # Static layer forms already defined in the current document
+        self._forms = set()
+
+    def geometry(self, num_weeks):
+        geometry = self._geometry.get(num_weeks)
+        if geometry is None:
+            geometry = GridGeometry(self.left, self.table_top, self.col_width,
+                                    self.gen.month_row_heights(num_weeks))
+            self._geometry[num_weeks] = geometry
+        return geometry
+
+    def render(self, pages, output_file):
+        listeners = self.gen.listeners
+        c = self.gen.canvas_class(output_file, pagesize=self.gen.page_size, invariant=1,
+                                  pageCompression=self.gen.profile['compression'])
+        self._forms = set()
+        for year, month in self.gen.prepared_pages(pages):
+            with timed(listeners, 'sizing'):
+                header_size, event_size = self.gen.calculate_optimal_sizes(year, month, self.available_height)
+            with timed(listeners, 'table'):
+                self.draw_month(c, year, month, header_size, event_size)
+            c.showPage()
+        with timed(listeners, 'build'):
+            c.save()
+        return output_file
+
+    def static_layer(self, geometry, heading_size, weekends=True):
+        """Cached static layer (backgrounds, grid, weekday headings) for this grid"""
+        gen = self.gen
+        return static_layer(
+            tuple(geometry.col_x), tuple(geometry.row_y), gen.cell_padding,
+            gen.grid_width, gen.corner_radius, tuple(sorted(gen.colors.items())),
+            tuple(self.weekend_columns) if weekends and gen.show_weekends else (),
+            tuple(gen.weekday_headers()), heading_size,
+        )
+
+    def text_runs(self, year, month, geometry, event_size):
+        """Lay out cell text as (color key, font, size, x, [(y, line), ...]) runs"""
+        gen = self.gen
+        event_index = gen.get_event_index(year)
+        padding = gen.cell_padding
+        day_size = event_size * 1.2
+        event_leading = event_size * 1.3
+        text_width = self.col_width - 2 * padding
+        for row, week in enumerate(gen.calendar.monthdayscalendar(year, month), start=1):
+            cell_top = geometry.row_y[row] - padding
+            for col, day in enumerate(week):
+                if day == 0:
+                    continue
+                x = geometry.col_x[col] + padding
+                yield 'day_number', 'Helvetica-Bold', day_size, x, [(cell_top - day_size, str(day))]
+
+                y = cell_top - DAY_NUMBER_LEADING
+                for event in event_index.day_events(month, day)[:MAX_EVENTS_PER_DAY]:
+                    key = 'holiday_text' if event['type'] == 'holiday' else 'event_text'
+                    y -= EVENT_SPACING
+                    lines = description_lines(event['description'], 'Helvetica', event_size, text_width)
+                    yield key, 'Helvetica', event_size, x, [
+                        (y - event_size - i * event_leading, line) for i, line in enumerate(lines)
+                    ]
+                    y -= len(lines) * event_leading + EVENT_SPACING
+
+    def draw_month(self, c, year, month, header_size, event_size):
+        gen = self.gen
+        geometry = self.geometry(len(gen.calendar.monthdayscalendar(year, month)))
+
+        # Define the static layer as a form once per document, then reference it
+        layer = self.static_layer(geometry, event_size * 1.1)
+        if layer.name not in self._forms:
+            c.beginForm(layer.name)
+            layer.draw(c)
+            c.endForm()
+            self._forms.add(layer.name)
+
+        # Month title
+        c.setFillColor(colors.black)
+        c.setFont('Helvetica', header_size)
+        c.drawCentredString(self.page_width / 2, self.header_top - header_size,
+                            f'{cal.month_name[month]} {year}')
+
+        c.doForm(layer.name)
+
+        for color_key, font_name, font_size, x, lines in self.text_runs(year, month, geometry, event_size):
+            c.setFillColor(self.color[color_key])
+            c.setFont(font_name, font_size)
+            for y, line in lines:
+                c.drawString(x, y, line)
+
+
+class StaticLayer:
+    """Drawing operations for the parts of a month page that don't depend on the month"""
+
+    def __init__(self, name, ops):
+        self.name = name
+        self.ops = ops
+
+    def draw(self, c):
+        for op, *args in self.ops:
+            if op == 'fill':
+                c.setFillColor(args[0])
+            elif op == 'stroke':
+                c.setStrokeColor(args[0])
+            elif op == 'width':
+                c.setLineWidth(args[0])
+            elif op == 'rect':
+                c.rect(*args, stroke=0, fill=1)
+            elif op == 'lines':
+                c.lines(args[0])
+            elif op == 'outline':
+                c.roundRect(*args, stroke=1, fill=0)
+            elif op == 'clip':
+                path = c.beginPath()
+                path.roundRect(*args)
+                c.clipPath(path, stroke=0, fill=0)
+            elif op == 'save':
+                c.saveState()
+            elif op == 'restore':
+                c.restoreState()
+            elif op == 'font':
+                c.setFont(*args)
+            elif op == 'text':
+                c.drawString(*args)
+
+
+@lru_cache(maxsize=STATIC_LAYER_CACHE_SIZE)
+def static_layer(col_x, row_y, padding, grid_width, radius, scheme, weekend_columns, headings, heading_size):
+    """Build the static layer for one grid configuration.
+
+    Memoized process-wide on every input that affects the drawing, so the
+    geometry and color work is shared across pages, documents and requests.
+    """
+    color = {name: colors.HexColor(value) for name, value in scheme}
+    left, right = col_x[0], col_x[-1]
+    top, bottom = row_y[0], row_y[-1]
+    width, height = right - left, top - bottom
+    ops = []
+
+    # Backgrounds, clipped to the rounded table outline
+    ops.append(('save',))
+    if radius > 0:
+        ops.append(('clip', left, bottom, width, height, radius))
+    ops.append(('fill', color['header_bg']))
+    ops.append(('rect', left, row_y[1], width, row_y[0] - row_y[1]))
+    if weekend_columns:
+        ops.append(('fill', color['weekend_bg']))
+        for col in weekend_columns:
+            ops.append(('rect', col_x[col], bottom, col_x[col + 1] - col_x[col], row_y[1] - bottom))
+    ops.append(('restore',))
+
+    # Grid lines
+    if grid_width > 0:
+        ops.append(('stroke', color['grid']))
+        ops.append(('width', grid_width))
+        rows = row_y[1:-1] if radius > 0 else row_y
+        cols = col_x[1:-1] if radius > 0 else col_x
+        ops.append(('lines', [(left, y, right, y) for y in rows] + [(x, top, x, bottom) for x in cols]))
+        if radius > 0:
+            ops.append(('outline', left, bottom, width, height, radius))
+
+    # Weekday headings
+    ops.append(('fill', color['header_text']))
+    ops.append(('font', 'Helvetica-Bold', heading_size))
+    baseline = top - padding - heading_size
+    for col, heading in enumerate(headings):
+        ops.append(('text', col_x[col] + padding, baseline, heading))
+
+    key = repr((col_x, row_y, padding, grid_width, radius, scheme, weekend_columns, headings, heading_size))
+    name = 'CalendarGrid' + hashlib.sha1(key.encode('utf-8')).hexdigest()[:12]
+    return StaticLayer(name, ops)
+
+
+def render_canvas(calendar_gen, pages, output_file):
+    """Render (year, month) pages with the direct canvas engine"""
+    return CanvasRenderer(calendar_gen).render(pages, output_file)
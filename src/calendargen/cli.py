@@ -0,0 +1,220 @@
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from .generator import DynamicCalendarGenerator
+from .holidays import get_holidays_range
+
+# Manifest columns that are not styling keys
+JOB_FIELDS = ('year', 'events', 'output', 'styling')
+
+# Styling keys that are not strings, converted like the web form's fields
+INT_STYLING = ('header_size', 'event_size')
+FLOAT_STYLING = ('cell_padding', 'grid_width', 'corner_radius')
+BOOL_STYLING = ('show_weekends', 'compact_mode')
+TRUE_VALUES = ('1', 'true', 'yes', 'on')
+FALSE_VALUES = ('0', 'false', 'no', 'off', '')
+
+# Parsed events shared by every job in a worker: {events path: (recurring, specific, rules)}
+_shared_events = {}
+
+
+def _coerce_styling(styling):
+    """Convert numeric and boolean styling values given as strings"""
+    for key, value in styling.items():
+        if not isinstance(value, str):
+            continue
+        if key in INT_STYLING:
+            styling[key] = int(value)
+        elif key in FLOAT_STYLING:
+            styling[key] = float(value)
+        elif key in BOOL_STYLING:
+            flag = value.strip().lower()
+            if flag not in TRUE_VALUES + FALSE_VALUES:
+                raise ValueError(f'{key} must be true or false, not {value!r}')
+            styling[key] = flag in TRUE_VALUES
+    return styling
+
+
+def load_manifest(path):
+    """Read batch jobs from a CSV or JSON manifest.
+
+    Each job needs year and output, and may give events (CSV path) and
+    styling (a dict, or a JSON object string in CSV manifests). Any other
+    CSV columns are treated as styling keys; numeric and boolean keys given
+    as strings are converted. Relative paths are resolved against the
+    manifest's directory.
+    """
+    base_dir = os.path.dirname(os.path.abspath(path))
+    with open(path, 'r', newline='') as f:
+        if path.lower().endswith('.json'):
+            rows = json.load(f)
+            if isinstance(rows, dict):
+                rows = rows.get('jobs', [])
+        else:
+            rows = list(csv.DictReader(f))
+
+    jobs = []
+    for number, row in enumerate(rows, start=1):
+        if not row.get('year') or not row.get('output'):
+            raise ValueError(f'Manifest entry {number}: year and output are required')
+        styling = row.get('styling') or {}
+        if isinstance(styling, str):
+            styling = json.loads(styling)
+        styling = dict(styling)
+        for key, value in row.items():
+            if key not in JOB_FIELDS and value not in (None, ''):
+                styling[key] = value
+        try:
+            _coerce_styling(styling)
+        except ValueError as e:
+            raise ValueError(f'Manifest entry {number}: {e}') from None
+
+        events = row.get('events') or None
+        if events:
+            events = os.path.join(base_dir, events)
+        jobs.append({
+            'year': int(row['year']),
+            'events': events,
+            'output': os.path.join(base_dir, row['output']),
+            'styling': styling,
+        })
+    return jobs
+
+
+def _init_worker(shared_events):
+    global _shared_events
+    _shared_events = shared_events
+
+
+def _run_job(number, job):
+    """Render one manifest job, returning (number, output, seconds, size, error)"""
+    start = time.perf_counter()
+    try:
+        calendar_gen = DynamicCalendarGenerator(job['styling'])
+        if job['events']:
+            # Shared, read-only parsed events
+            (calendar_gen.recurring_events, calendar_gen.specific_events,
+             calendar_gen.rule_events) = _shared_events[job['events']]
+        output = job['output']
+        os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+        calendar_gen.generate_calendar(job['year'], output)
+        size = os.path.getsize(output)
+        error = None
+    except Exception as e:
+        size = 0
+        error = str(e)
+    return number, job['output'], time.perf_counter() - start, size, error
+
+
+def _parse_shared_events(jobs):
+    """Parse each events file once, keeping only the years some job renders.
+
+    Returns (shared, failed): parsed events and the error of each file that
+    could not be loaded, whose jobs are reported as failed.
+    """
+    years_by_file = {}
+    for job in jobs:
+        if job['events']:
+            years_by_file.setdefault(job['events'], set()).add(job['year'])
+
+    shared = {}
+    failed = {}
+    for path, years in years_by_file.items():
+        calendar_gen = DynamicCalendarGenerator()
+        try:
+            calendar_gen.load_events(path, years=years, strict=True)
+        except Exception as e:
+            failed[path] = f'events {path}: {e}'
+            continue
+        shared[path] = (calendar_gen.recurring_events, calendar_gen.specific_events, calendar_gen.rule_events)
+    return shared, failed
+
+
+def _prime_holidays(jobs):
+    """Compute each needed (countries, year) holiday table once up front"""
+    years = [job['year'] for job in jobs]
+    for countries in {job['styling'].get('holidays') or 'none' for job in jobs}:
+        get_holidays_range(countries, min(years), max(years))
+
+
+def run_batch(jobs, workers=None, out=sys.stdout):
+    """Render every job, printing per-job timing and overall throughput"""
+    start = time.perf_counter()
+    shared_events, failed_events = _parse_shared_events(jobs)
+    _prime_holidays(jobs)
+    prepared = time.perf_counter() - start
+
+    results = []
+    runnable = []
+    for number, job in enumerate(jobs, start=1):
+        if job['events'] in failed_events:
+            results.append((number, job['output'], 0.0, 0, failed_events[job['events']]))
+        else:
+            runnable.append((number, job))
+    if workers == 1:
+        _init_worker(shared_events)
+        results.extend(_run_job(number, job) for number, job in runnable)
+    elif runnable:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(shared_events,)) as executor:
+            futures = [executor.submit(_run_job, number, job) for number, job in runnable]
+            results.extend(f.result() for f in futures)
+    results.sort()
+    elapsed = time.perf_counter() - start
+
+    failures = 0
+    total_bytes = 0
+    for number, output, seconds, size, error in results:
+        if error:
+            failures += 1
+            print(f'[{number}] FAILED {output}: {error}', file=out)
+        else:
+            total_bytes += size
+            print(f'[{number}] {output} {seconds * 1000:.1f} ms {size} bytes', file=out)
+
+    done = len(results) - failures
+    print(f'Prepared {len(shared_events)} event file(s) in {prepared:.2f}s', file=out)
+    print(f'Rendered {done}/{len(results)} calendars in {elapsed:.2f}s '
+          f'({done / elapsed if elapsed else 0:.1f} calendars/s, {total_bytes} bytes)', file=out)
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='calendargen', description='Calendar PDF generator')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    batch = subparsers.add_parser('batch', help='Generate many calendars from a manifest')
+    batch.add_argument('manifest', help='CSV or JSON manifest of year, styling, events, output')
+    batch.add_argument('-j', '--workers', type=int, default=None,
+                       help='Worker processes (default: CPU count, 1 runs in-process)')
+
+    bench = subparsers.add_parser('bench', help='Time each generation stage against a baseline')
+    bench.add_argument('--stages', help='Comma-separated stages (default: all)')
+    bench.add_argument('--repeat', type=int, default=5, help='Runs per benchmark, the median is reported')
+    bench.add_argument('--quick', action='store_true', help='Smaller inputs and fewer configurations')
+    bench.add_argument('--baseline',
+                       help='JSON baseline to compare against, or none '
+                            '(default with --quick: the bundled reference baseline, '
+                            'enforced only on a machine matching its profile)')
+    bench.add_argument('--save-baseline', help='Write results as a JSON baseline')
+    bench.add_argument('--threshold', type=float, default=0.25,
+                       help='Allowed slowdown vs baseline before failing (default: 0.25 = 25%%)')
+
+    args = parser.parse_args(argv)
+    if args.command == 'batch':
+        jobs = load_manifest(args.manifest)
+        failures = run_batch(jobs, workers=args.workers)
+        return 1 if failures else 0
+    if args.command == 'bench':
+        from . import bench as bench_module
+        return bench_module.main(args)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,435 @@
+import calendar
+import csv
+import io
+import math
+import os
+import sys
+from datetime import date, datetime, time, timedelta
+
+from dateutil.rrule import DAILY, MONTHLY, WEEKLY, rrule, rrulestr
+
+# Number of malformed rows spelled out in an EventLoadError message
+MAX_REPORTED_ERRORS = 10
+
+# A calendar shows days, so rules may repeat at most daily
+RULE_FREQUENCIES = {'DAILY', 'WEEKLY', 'MONTHLY', 'YEARLY'}
+# Time-of-day parts would only repeat an event within a day
+RULE_TIME_PARTS = {'BYHOUR', 'BYMINUTE', 'BYSECOND'}
+# RRULE weekday names, Monday first
+WEEKDAY_CODES = ('MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU')
+# Most occurrences one rule yields for a date window (a year has 366 days)
+MAX_RULE_OCCURRENCES = 366
+# Years of occurrences each rule keeps once expanded
+MAX_CACHED_YEARS = 16
+# Steps (periods, or months crossed by daily and weekly rules) a COUNT rule
+# is followed from its start, since its earlier occurrences count too
+MAX_RULE_SCAN_STEPS = 240
+# Extra steps allowed past the months a window spans
+SCAN_STEP_MARGIN = 4
+
+
+class Event:
+    """A single calendar event, stored compactly.
+
+    Supports event['description'] / event['type'] access so it can stand in
+    for the plain dicts the layout code has always used.
+    """
+
+    __slots__ = ('description', 'type')
+
+    def __init__(self, description, type='other'):
+        self.description = description
+        # Share one string per distinct type across all events
+        self.type = sys.intern(type)
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key)
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def __eq__(self, other):
+        if not isinstance(other, Event):
+            return NotImplemented
+        return self.description == other.description and self.type == other.type
+
+    def __hash__(self):
+        return hash((self.description, self.type))
+
+    def __getstate__(self):
+        return self.description, self.type
+
+    def __setstate__(self, state):
+        self.description, self.type = state
+
+    def __repr__(self):
+        return f'Event({self.description!r}, {self.type!r})'
+
+
+class _ScanLimit(Exception):
+    """Raised inside a _BoundedRule expansion once its steps are used up"""
+
+
+class _BoundedRule(rrule):
+    """An rrule whose expansion gives up after max_steps steps.
+
+    dateutil only compares UNTIL against dates that match, so once a rule
+    stops matching it is scanned period by period to year 9999. Every
+    yearly or monthly period, and every month a daily or weekly rule
+    crosses, rebuilds the rule's masks, which reads _byeaster; counting
+    those reads bounds the scan.
+    """
+
+    def __init__(self, max_steps, **kwargs):
+        self._steps_left = max_steps
+        super().__init__(**kwargs)
+
+    @property
+    def _byeaster(self):
+        self._steps_left -= 1
+        if self._steps_left < 0:
+            raise _ScanLimit
+        return self._easter
+
+    @_byeaster.setter
+    def _byeaster(self, value):
+        self._easter = value
+
+
+def _months_between(first, last):
+    return (last.year - first.year) * 12 + last.month - first.month
+
+
+class Recurrence:
+    """A recurrence rule (RFC 5545 RRULE syntax) starting on a date.
+
+    Occurrences are only computed on request, one year at a time, and kept
+    per year so the index, page keys and worker state share one expansion.
+    A rule costs the same to load whether it repeats for a month or
+    forever. Only daily or coarser rules with INTERVAL >= 1 are accepted;
+    anything else raises ValueError.
+    """
+
+    __slots__ = ('start', 'rule', '_rrule', '_years', '_counted')
+
+    def __init__(self, start, rule):
+        self.start = start
+        self.rule = rule.strip()
+        _check_rule(self.rule, start)
+        self._rrule = rrulestr(self.rule, dtstart=datetime.combine(start, time.min))
+        if not isinstance(self._rrule, rrule):
+            raise ValueError('only a single RRULE is supported')
+        self._years = {}
+        self._counted = None
+
+    def between(self, first, last):
+        """Occurrence dates from first to last inclusive, at most MAX_RULE_OCCURRENCES"""
+        dates = []
+        for year in range(first.year, last.year + 1):
+            dates.extend(d for d in self.in_year(year) if first <= d <= last)
+            if len(dates) >= MAX_RULE_OCCURRENCES:
+                break
+        return dates[:MAX_RULE_OCCURRENCES]
+
+    def in_year(self, year):
+        """Tuple of occurrence dates in year, expanded once and then reused"""
+        dates = self._years.get(year)
+        if dates is None:
+            if self._rrule._count is None:
+                dates = self._expand(date(year, 1, 1), date(year, 12, 31))
+            else:
+                dates = tuple(d for d in self._count_dates() if d.year == year)
+            if len(self._years) >= MAX_CACHED_YEARS:
+                self._years.clear()
+            self._years[year] = dates
+        return dates
+
+    def _expand(self, first, last):
+        """Occurrences from first to last of a rule without COUNT.
+
+        The search starts at the last period of the rule (FREQ x INTERVAL)
+        that begins on or before first, rather than at the rule's start,
+        and is bounded to the steps needed to pass last.
+        """
+        until = self._rrule._until
+        if until is not None:
+            last = min(last, until.date())
+        if last < max(first, self.start):
+            return ()
+        dtstart = self._aligned_start(first)
+        window = self._bounded(_months_between(dtstart, last) + SCAN_STEP_MARGIN,
+                               dtstart=dtstart, until=datetime.combine(last, time.min))
+        return tuple(d for d in self._dates(window) if d >= first)
+
+    def _count_dates(self):
+        """Every occurrence of a COUNT rule, following it for at most MAX_RULE_SCAN_STEPS.
+
+        Occurrences before any window count towards COUNT, so these rules
+        are always expanded from their start; one that has not used up its
+        COUNT within the scan limit is taken to have ended there.
+        """
+        if self._counted is None:
+            window = self._bounded(MAX_RULE_SCAN_STEPS, dtstart=self._rrule._dtstart,
+                                   count=self._rrule._count)
+            self._counted = tuple(self._dates(window))
+        return self._counted
+
+    def _aligned_start(self, first):
+        """Start of the rule's last period on or before first, for any first after start"""
+        start, freq, interval = self.start, self._rrule._freq, self._rrule._interval
+        if first <= start:
+            return start
+        if freq in (DAILY, WEEKLY):
+            step = interval * (7 if freq == WEEKLY else 1)
+            return start + timedelta(days=(first - start).days // step * step)
+        if freq == MONTHLY:
+            months = _months_between(start, first)
+            months -= months % interval
+            if not months:
+                return start
+            year, month = divmod(start.month - 1 + months, 12)
+            return date(start.year + year, month + 1, 1)
+        years = first.year - start.year
+        years -= years % interval
+        return date(start.year + years, 1, 1) if years else start
+
+    def _bounded(self, max_steps, dtstart, until=None, count=None):
+        """This rule as a _BoundedRule from dtstart.
+
+        dateutil fills in BYMONTH, BYMONTHDAY or BYDAY from the start date
+        when a rule has no day filters, so those are pinned to self.start
+        before the start moves.
+        """
+        pinned = {'bymonth': self.start.month, 'bymonthday': self.start.day,
+                  'byweekday': self.start.weekday()}
+        kwargs = {'freq': self._rrule._freq, 'interval': self._rrule._interval,
+                  'wkst': self._rrule._wkst}
+        for key, value in self._rrule._original_rule.items():
+            kwargs[key] = pinned[key] if value is None else value
+        kwargs.update(dtstart=datetime.combine(dtstart, time.min), until=until, count=count)
+        return _BoundedRule(max_steps, **kwargs)
+
+    @staticmethod
+    def _dates(window):
+        dates = []
+        try:
+            for occurrence in window:
+                dates.append(occurrence.date())
+        except _ScanLimit:
+            pass
+        return dates
+
+    def __eq__(self, other):
+        if not isinstance(other, Recurrence):
+            return NotImplemented
+        return self.start == other.start and self.rule == other.rule
+
+    def __hash__(self):
+        return hash((self.start, self.rule))
+
+    def __getstate__(self):
+        # Expanded years travel along, so render workers reuse them
+        return self.start, self.rule, self._years
+
+    def __setstate__(self, state):
+        self.__init__(state[0], state[1])
+        if len(state) > 2:
+            self._years.update(state[2])
+
+    def __repr__(self):
+        return f'Recurrence({self.start!r}, {self.rule!r})'
+
+
+def _rule_ints(value):
+    return [int(v) for v in value.split(',') if v.strip()]
+
+
+def _check_rule(rule, start):
+    """Reject rules that repeat more than daily, never advance or can never match.
+
+    dateutil searches for the next occurrence period by period up to year
+    9999, so a rule whose filters contradict each other (BYMONTH=2 with
+    BYMONTHDAY=30) would make every expansion scan thousands of years.
+    """
+    text = rule.upper()
+    if text.startswith('RRULE:'):
+        text = text[len('RRULE:'):]
+    parts = {}
+    for part in text.split(';'):
+        name, _, value = part.partition('=')
+        parts[name.strip()] = value.strip()
+
+    freq = parts.get('FREQ')
+    if freq not in RULE_FREQUENCIES:
+        raise ValueError(f'FREQ must be one of {", ".join(sorted(RULE_FREQUENCIES))}')
+    interval = parts.get('INTERVAL', '1')
+    if not interval.isdigit() or int(interval) < 1:
+        raise ValueError('INTERVAL must be a positive integer')
+    interval = int(interval)
+    time_parts = RULE_TIME_PARTS & parts.keys()
+    if time_parts:
+        raise ValueError(f'{", ".join(sorted(time_parts))} is not supported')
+
+    months = _rule_ints(parts['BYMONTH']) if 'BYMONTH' in parts else list(range(1, 13))
+    if not all(1 <= month <= 12 for month in months):
+        raise ValueError('BYMONTH must be between 1 and 12')
+    if 'BYMONTHDAY' in parts:
+        month_days = _rule_ints(parts['BYMONTHDAY'])
+        # Leap year lengths, so 02-29 stays valid
+        if not any(1 <= abs(day) <= calendar.monthrange(2000, month)[1]
+                   for month in months for day in month_days):
+            raise ValueError('BYMONTHDAY does not fall in any BYMONTH month')
+    if 'BYYEARDAY' in parts and not all(1 <= abs(day) <= 366 for day in _rule_ints(parts['BYYEARDAY'])):
+        raise ValueError('BYYEARDAY must be between 1 and 366')
+    if 'BYWEEKNO' in parts and not all(1 <= abs(week) <= 53 for week in _rule_ints(parts['BYWEEKNO'])):
+        raise ValueError('BYWEEKNO must be between 1 and 53')
+
+    if 'BYDAY' in parts:
+        ordinals = [int(day[:-2]) for day in parts['BYDAY'].split(',') if day.strip()[:-2]]
+        if ordinals and freq not in ('MONTHLY', 'YEARLY'):
+            raise ValueError('BYDAY ordinals need FREQ=MONTHLY or YEARLY')
+        limit = 5 if freq == 'MONTHLY' or 'BYMONTH' in parts else 53
+        if not all(1 <= abs(n) <= limit for n in ordinals):
+            raise ValueError(f'BYDAY ordinals must be between 1 and {limit}')
+        # Every 7th day is always the same weekday
+        weekdays = [day.strip()[-2:] for day in parts['BYDAY'].split(',')]
+        if freq == 'DAILY' and interval % 7 == 0 and WEEKDAY_CODES[start.weekday()] not in weekdays:
+            raise ValueError(f'INTERVAL={interval} never reaches BYDAY from the start date')
+    if freq == 'MONTHLY' and 'BYMONTH' in parts:
+        step = math.gcd(interval, 12)
+        if not any((month - start.month) % step == 0 for month in months):
+            raise ValueError(f'INTERVAL={interval} never reaches BYMONTH from the start date')
+
+
+class EventLoadError(ValueError):
+    """Raised when strict loading finds malformed rows"""
+
+    def __init__(self, errors):
+        self.errors = errors
+        details = '; '.join(f'line {line}: {message}' for line, message in errors[:MAX_REPORTED_ERRORS])
+        if len(errors) > MAX_REPORTED_ERRORS:
+            details += f'; and {len(errors) - MAX_REPORTED_ERRORS} more'
+        super().__init__(f'Malformed events: {details}')
+
+
+class EventLimitError(ValueError):
+    """Raised when a source has more rows than the caller allows"""
+
+    def __init__(self, max_rows):
+        self.max_rows = max_rows
+        super().__init__(f'Too many events: at most {max_rows} rows are accepted')
+
+
+def _iter_rows(source):
+    """Yield (line number, row dict) from a path, file object or iterable"""
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'r', newline='') as file:
+            yield from _iter_rows(file)
+        return
+
+    if hasattr(source, 'read'):
+        if isinstance(source, (io.RawIOBase, io.BufferedIOBase)) or 'b' in getattr(source, 'mode', ''):
+            wrapper = io.TextIOWrapper(source, encoding='utf-8-sig', newline='')
+            try:
+                yield from _iter_csv(wrapper)
+            finally:
+                # Detach so collecting the wrapper leaves the caller's stream open
+                wrapper.detach()
+        else:
+            yield from _iter_csv(source)
+        return
+
+    rows = iter(source)
+    first = next(rows, None)
+    if first is None:
+        return
+    if isinstance(first, str):
+        # CSV text lines, header first
+        yield from _iter_csv(_chain(first, rows))
+    elif isinstance(first, dict):
+        for line, row in enumerate(_chain(first, rows), start=1):
+            yield line, row
+    else:
+        # Sequences of (date, event[, type[, rrule]])
+        for line, row in enumerate(_chain(first, rows), start=1):
+            yield line, dict(zip(('date', 'event', 'type', 'rrule'), row))
+
+
+def _iter_csv(lines):
+    reader = csv.DictReader(lines)
+    for row in reader:
+        yield reader.line_num, row
+
+
+def _chain(first, rest):
+    yield first
+    yield from rest
+
+
+def iter_events(source, years=None, errors=None, max_rows=None):
+    """Stream parsed events from a CSV source.
+
+    Yields ((month, day), Event) for MM-DD recurring rows, (date, Event)
+    for YYYY-MM-DD rows and (Recurrence, Event) for rows with an rrule
+    column (e.g. FREQ=MONTHLY;BYDAY=2TU), whose date is the first
+    occurrence. Dated rows outside years (if given), and rules starting
+    after them, are dropped as they are read. Malformed rows are skipped
+    and recorded in errors as (line number, message) when a list is
+    supplied. With max_rows, EventLimitError is raised as soon as one
+    more row is read, before the rest of the source is consumed.
+    """
+    years = set(years) if years is not None else None
+    last_year = max(years) if years else None
+
+    for count, (line, row) in enumerate(_iter_rows(source), start=1):
+        if max_rows is not None and count > max_rows:
+            raise EventLimitError(max_rows)
+        date_str = (row.get('date') or '').strip()
+        description = row.get('event')
+        if not date_str:
+            if errors is not None:
+                errors.append((line, "missing 'date' value"))
+            continue
+        if description is None:
+            if errors is not None:
+                errors.append((line, "missing 'event' value"))
+            continue
+
+        rule = (row.get('rrule') or '').strip()
+        if rule:
+            try:
+                start = datetime.strptime(date_str, '%Y-%m-%d').date()
+            except ValueError:
+                if errors is not None:
+                    errors.append((line, f'recurrence needs a YYYY-MM-DD start date, got {date_str!r}'))
+                continue
+            if last_year is not None and start.year > last_year:
+                continue
+            try:
+                key = Recurrence(start, rule)
+            except (ValueError, TypeError) as e:
+                if errors is not None:
+                    errors.append((line, f'invalid recurrence rule {rule!r}: {e}'))
+                continue
+            yield key, Event(description, row.get('type') or 'other')
+            continue
+
+        try:
+            if len(date_str) == 5:  # MM-DD format
+                month, day = map(int, date_str.split('-'))
+                # Validate against a leap year so 02-29 is accepted
+                date(2000, month, day)
+                key = (month, day)
+            else:  # YYYY-MM-DD format
+                key = datetime.strptime(date_str, '%Y-%m-%d').date()
+                if years is not None and key.year not in years:
+                    continue
+        except ValueError:
+            if errors is not None:
+                errors.append((line, f'invalid date {date_str!r}'))
+            continue
+
+        yield key, Event(description, row.get('type') or 'other')
@@ -1,13 +1,18 @@
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4, LETTER, LEGAL
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch, mm
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak
 from reportlab.pdfgen import canvas
 import calendar as cal
-import csv
-from datetime import datetime, date
+import io
+from datetime import date
 from .holidays import get_holidays
+from .cache import make_render_key, make_page_key
+from .styles import get_style_sheet
+from .index import EventIndex
+from .events import iter_events, EventLoadError, Recurrence
+from .instrument import timed
+from .output import get_profile, canvas_class
 
 # Modern color schemes
 COLOR_SCHEMES = {
@@ -48,10 +53,13 @@ class DynamicCalendarGenerator:
         self.styling = styling or {}
         self.recurring_events = {}
         self.specific_events = {}
+        # Recurrence rule -> events, expanded per rendered year
+        self.rule_events = {}
+        self.load_errors = []
         
         # Get color scheme
-        scheme_name = self.styling.get('color_scheme', 'minimal')
-        self.colors = COLOR_SCHEMES[scheme_name]
+        self.scheme_name = self.styling.get('color_scheme', 'minimal')
+        self.colors = COLOR_SCHEMES[self.scheme_name]
         
         # Set paper size with margins
         paper_size = self.styling.get('paper_size', 'A4').upper()
@@ -71,51 +79,37 @@ class DynamicCalendarGenerator:
         self.corner_radius = float(self.styling.get('corner_radius', 2))  # Rounded corners (in points)
         self.show_weekends = self.styling.get('show_weekends', True)  # Different styling for weekends
         self.compact_mode = self.styling.get('compact_mode', False)  # More compact layout
+        self.engine = self.styling.get('engine', 'platypus')  # 'canvas' draws pages directly
+        
+        # Output profile: 'fast', 'standard' or 'small' (see output.OUTPUT_PROFILES)
+        self.output_profile = self.styling.get('output_profile') or 'standard'
+        self.profile = get_profile(self.output_profile)
+        self.canvas_class = canvas_class(self.profile)
         
         # Set week start (0 = Monday, 6 = Sunday)
-        week_start = int(self.styling.get('weekstart', 0))
-        cal.setfirstweekday(week_start)
+        # Owned per instance rather than cal.setfirstweekday(), which is
+        # process-global and races between threads
+        self.week_start = int(self.styling.get('weekstart', 0))
+        self.calendar = cal.Calendar(firstweekday=self.week_start)
         
         self.year = None
         self.holidays = {}
+        self.event_index = None
+        
+        # Stage timing listeners, called as listener(stage, seconds)
+        self.listeners = []
         
         # Initialize styles
         self.setup_styles()
 
+    def add_listener(self, listener):
+        """Subscribe listener(stage, seconds) to load/holidays/index/sizing/table/build timings"""
+        self.listeners.append(listener)
+        return listener
+
     def setup_styles(self, header_size=24, event_size=10):
-        """Setup styles with given font sizes and modern aesthetic"""
-        self.styles = getSampleStyleSheet()
-        
-        # Modern header style
-        self.styles.add(ParagraphStyle(
-            name='MonthHeader',
-            fontSize=header_size,
-            alignment=1,
-            spaceAfter=15,
-            fontName='Helvetica-Bold',
-            textColor=colors.HexColor(self.colors['header_text']),
-            leading=header_size * 1.2
-        ))
-        
-        # Clean event text style
-        self.styles.add(ParagraphStyle(
-            name='EventText',
-            fontSize=event_size,
-            fontName='Helvetica',
-            textColor=colors.HexColor(self.colors['event_text']),
-            leading=event_size * 1.3,
-            spaceBefore=2,
-            spaceAfter=2
-        ))
-        
-        # Day number style
-        self.styles.add(ParagraphStyle(
-            name='DayNumber',
-            fontSize=event_size * 1.2,
-            fontName='Helvetica-Bold',
-            textColor=colors.HexColor(self.colors['day_number']),
-            alignment=0  # Left align
-        ))
+        """Setup styles with given font sizes from the shared style registry"""
+        self.styles = get_style_sheet(self.scheme_name, header_size, event_size)
 
     def _get_weekend_style(self, day_of_week):
         """Get special styling for weekends"""
@@ -136,30 +130,10 @@ class DynamicCalendarGenerator:
         max_event = int(self.styling.get('event_size', 10))
         
         # Get number of weeks in this month
-        num_weeks = len(cal.monthcalendar(year, month))
+        num_weeks = len(self.calendar.monthdayscalendar(year, month))
         
         # Calculate maximum events per day for this month
-        max_events_per_day = 0
-        for day in range(1, 32):
-            try:
-                current_date = date(year, month, day)
-            except ValueError:
-                break
-                
-            events_count = 0
-            # Count specific events
-            if current_date in self.specific_events:
-                events_count += len(self.specific_events[current_date])
-            
-            # Count recurring events
-            if month in self.recurring_events and day in self.recurring_events[month]:
-                events_count += len(self.recurring_events[month][day])
-            
-            # Count holiday
-            if current_date in self.holidays:
-                events_count += 1
-            
-            max_events_per_day = max(max_events_per_day, events_count)
+        max_events_per_day = self.get_event_index(year).max_events(month)
 
         # Calculate cell height available for events
         cell_height = available_height / (num_weeks + 1)  # +1 for header row
@@ -180,42 +154,72 @@ class DynamicCalendarGenerator:
         
         return int(max_header), int(max_event)
 
-    def load_events(self, csv_file):
-        """Load events from CSV file"""
+    def load_events(self, csv_file, years=None, strict=False, max_rows=None):
+        """Load events from a CSV path, file object or iterable of rows.
+
+        Rows are streamed; dated events outside years (if given) are
+        discarded while reading. Malformed rows are skipped and recorded in
+        self.load_errors as (line, message), or raise EventLoadError when
+        strict is set. Sources longer than max_rows raise EventLimitError.
+        Returns the number of events kept.
+        """
+        self.load_errors = []
         if not csv_file:
-            return
-            
-        with open(csv_file, 'r') as file:
-            reader = csv.DictReader(file)
-            for row in reader:
-                event = {
-                    'description': row['event'],
-                    'type': row.get('type', 'other')
-                }
-                
-                date_str = row['date'].strip()
-                if len(date_str) == 5:  # MM-DD format
-                    month, day = map(int, date_str.split('-'))
-                    if month not in self.recurring_events:
-                        self.recurring_events[month] = {}
-                    if day not in self.recurring_events[month]:
-                        self.recurring_events[month][day] = []
-                    self.recurring_events[month][day].append(event)
+            return 0
+        
+        loaded = 0
+        with timed(self.listeners, 'load'):
+            for key, event in iter_events(csv_file, years, self.load_errors, max_rows):
+                if isinstance(key, tuple):  # MM-DD format
+                    month, day = key
+                    self.recurring_events.setdefault(month, {}).setdefault(day, []).append(event)
+                elif isinstance(key, Recurrence):  # RRULE recurrence
+                    self.rule_events.setdefault(key, []).append(event)
                 else:  # YYYY-MM-DD format
-                    date = datetime.strptime(date_str, '%Y-%m-%d').date()
-                    if date not in self.specific_events:
-                        self.specific_events[date] = []
-                    self.specific_events[date].append(event)
+                    self.specific_events.setdefault(key, []).append(event)
+                loaded += 1
+        
+        # Events changed, rebuild the index on next use
+        self.event_index = None
+        
+        if strict and self.load_errors:
+            raise EventLoadError(self.load_errors)
+        return loaded
+
+    def build_event_index(self, year):
+        """Index loaded events and holidays by day of year for layout lookups"""
+        with timed(self.listeners, 'index'):
+            self.event_index = EventIndex(year, self.recurring_events, self.specific_events, self.holidays,
+                                          self.rule_events)
+        return self.event_index
+
+    def get_event_index(self, year):
+        """Return the event index for year, building it if needed"""
+        if self.event_index is None or self.event_index.year != year:
+            return self.build_event_index(year)
+        return self.event_index
+
+    def cache_key(self, year, pages=None):
+        """Content hash of everything that affects the rendered PDF for year.
+
+        Pass pages when rendering a month range rather than the full year.
+        """
+        return make_render_key(year, self.styling, self.recurring_events, self.specific_events, pages,
+                               self.rule_events)
+
+    def page_key(self, year, month):
+        """Content hash of everything that affects a single month page"""
+        return make_page_key(year, month, self.styling, self.recurring_events, self.specific_events,
+                             self.rule_events)
 
     def create_month_table(self, year, month, header_size, event_size):
         """Create month table with modern styling"""
         self.setup_styles(header_size, event_size)
         
         # Get calendar data and create basic structure
-        cal_matrix = cal.monthcalendar(year, month)
-        headers = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
-        if cal.firstweekday() == 6:
-            headers = headers[-1:] + headers[:-1]
+        cal_matrix = self.calendar.monthdayscalendar(year, month)
+        event_index = self.get_event_index(year)
+        headers = self.weekday_headers()
         
         # Modern table style
         base_style = [
@@ -253,89 +257,75 @@ class DynamicCalendarGenerator:
                 else:
                     cell_content = [Paragraph(f"<b>{day}</b>", self.styles['DayNumber'])]
                     
-                    # Collect all events for this day
-                    events = []
-                    current_date = date(year, month, day)
-                    
-                    # Add specific events
-                    if current_date in self.specific_events:
-                        events.extend(self.specific_events[current_date])
-                    
-                    # Add recurring events
-                    if month in self.recurring_events and day in self.recurring_events[month]:
-                        events.extend(self.recurring_events[month][day])
-                    
-                    # Add holiday
-                    if current_date in self.holidays:
-                        events.append({
-                            'description': self.holidays[current_date],
-                            'type': 'holiday'
-                        })
+                    # Specific, recurring and holiday events for this day
+                    events = event_index.day_events(month, day)
                     
                     # Add events to cell (limited to 3)
                     for event in events[:3]:
                         style = self.styles['EventText']
                         if event['type'] == 'holiday':
-                            style = ParagraphStyle(
-                                'HolidayStyle',
-                                parent=self.styles['EventText'],
-                                textColor=colors.HexColor(self.colors['holiday_text'])
-                            )
+                            style = self.styles['HolidayText']
                         event_text = Paragraph(event['description'], style)
                         cell_content.append(event_text)
                 
                 row_data.append(cell_content if isinstance(cell_content, list) else '')
             table_data.append(row_data)
         
+        return table_data, TableStyle(base_style), self.month_row_heights(len(cal_matrix))
+
+    def month_row_heights(self, num_weeks):
+        """Header row plus week row heights for a month grid"""
         # Calculate row heights based on compact mode
         row_factor = 0.8 if self.compact_mode else 1.0
-        num_weeks = len(cal_matrix)
         available_height = self.page_size[1] - 80*mm
         row_height = (available_height / num_weeks) * row_factor
-        row_heights = [12*mm] + [row_height] * num_weeks
+        return [12*mm] + [row_height] * num_weeks
 
-        return table_data, TableStyle(base_style), row_heights
+    def weekday_headers(self):
+        """Column headings rotated to the configured week start"""
+        headers = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+        return headers[self.week_start:] + headers[:self.week_start]
 
-    def generate_calendar(self, year, output_file):
-        self.year = year
-        
-        # Load holidays if specified
-        holiday_country = self.styling.get('holidays')
-        if holiday_country and holiday_country != 'none':
-            self.holidays = get_holidays(year, holiday_country)
-        
-        # Create PDF document
-        doc = SimpleDocTemplate(
+    def create_document(self, output_file):
+        """Create the PDF document template for this generator's page setup"""
+        return SimpleDocTemplate(
             output_file,
             pagesize=self.page_size,
             rightMargin=10*mm,
             leftMargin=10*mm,
             topMargin=15*mm,
-            bottomMargin=15*mm
+            bottomMargin=15*mm,
+            pageCompression=self.profile['compression'],
+            invariant=True  # Deterministic bytes so cache keys can serve as strong ETags
         )
-        
+
+    def build_document(self, doc, story):
+        """Lay out and write story, encoding streams as the output profile asks"""
+        doc.build(story, canvasmaker=self.canvas_class)
+
+    def load_holidays(self, year):
+        """Load holidays for year if a holiday country is configured"""
+        holiday_country = self.styling.get('holidays')
+        if holiday_country and holiday_country != 'none':
+            with timed(self.listeners, 'holidays'):
+                self.holidays = get_holidays(year, holiday_country)
+
+    def build_month_story(self, year, month, doc):
+        """Build the flowables (header and table) for a single month page"""
         # Calculate available height for the table
         available_height = self.page_size[1] - (doc.topMargin + doc.bottomMargin + 30*mm)
         
-        story = []
-        for month in range(1, 13):
-            # Calculate optimal font sizes for this month
+        # Calculate optimal font sizes for this month
+        with timed(self.listeners, 'sizing'):
             header_size, event_size = self.calculate_optimal_sizes(year, month, available_height)
+        
+        with timed(self.listeners, 'table'):
+            # Create month table with calculated sizes
+            table_data, style, row_heights = self.create_month_table(year, month, header_size, event_size)
             
             # Add month header
             month_name = cal.month_name[month]
-            story.append(Paragraph(
-                f"{month_name} {year}",
-                ParagraphStyle(
-                    'MonthHeader',
-                    fontSize=header_size,
-                    alignment=1,
-                    spaceAfter=20
-                )
-            ))
-            
-            # Create month table with calculated sizes
-            table_data, style, row_heights = self.create_month_table(year, month, header_size, event_size)
+            header = Paragraph(f"{month_name} {year}", self.styles['PageHeader'])
             
             # Calculate table width
             available_width = self.page_size[0] - (doc.leftMargin + doc.rightMargin)
@@ -343,18 +333,138 @@ class DynamicCalendarGenerator:
             
             table = Table(table_data, colWidths=[col_width]*7, rowHeights=row_heights)
             table.setStyle(style)
+        
+        return [header, table]
+
+    def prepare_year(self, year):
+        """Load holidays and the event index for year unless already current"""
+        if self.year != year or self.event_index is None or self.event_index.year != year:
+            self.year = year
+            self.load_holidays(year)
+            self.build_event_index(year)
+
+    def prepared_pages(self, pages):
+        """Yield (year, month) pages, preparing each year as it is reached"""
+        for year, month in pages:
+            self.prepare_year(year)
+            yield year, month
+
+    def generate_calendar(self, year, output_file, workers=None, months=None, page_cache=None):
+        """Render the calendar to a path or any binary file-like object with write().
+
+        months limits the output to those months of year (default: all 12).
+        With workers > 1 each month page is rendered in a separate process
+        and the pages are merged in month order (requires pypdf). The canvas
+        engine is always serial.
+        """
+        pages = [(year, month) for month in (months or range(1, 13))]
+        return self.render_pages(pages, output_file, workers, page_cache)
+
+    def generate_range(self, start, end, output_file, workers=None, page_cache=None):
+        """Render every month from start to end inclusive, across year boundaries.
+
+        start and end are dates or (year, month) tuples.
+        """
+        return self.render_pages(month_span(start, end), output_file, workers, page_cache)
+
+    def render_pages(self, pages, output_file, workers=None, page_cache=None):
+        """Render (year, month) pages, one per page, in the given order.
+
+        With a page_cache (a RenderCache) each month is rendered as its own
+        PDF keyed by page_key, and the document is assembled from cached
+        pages, so only months whose events changed are rendered again
+        (requires pypdf).
+        """
+        pages = list(pages)
+        if page_cache is not None:
+            return self.render_cached_pages(pages, output_file, page_cache, workers)
+        
+        if self.engine == 'canvas':
+            from .canvas_engine import render_canvas
+            return render_canvas(self, pages, output_file)
+        
+        if workers and workers > 1:
+            from .parallel import render_months_parallel
+            with timed(self.listeners, 'build'):
+                render_months_parallel(self, pages, output_file, workers)
+            return output_file
+        
+        # Create PDF document
+        doc = self.create_document(output_file)
+        
+        story = []
+        for number, (year, month) in enumerate(self.prepared_pages(pages), start=1):
+            story.extend(self.build_month_story(year, month, doc))
             
-            story.append(table)
-            
-            if month < 12:
+            if number < len(pages):
                 story.append(PageBreak())
         
         # Build the document
-        doc.build(story)
+        with timed(self.listeners, 'build'):
+            self.build_document(doc, story)
+        return output_file
+
+    def render_cached_pages(self, pages, output_file, page_cache, workers=None):
+        """Assemble pages from page_cache, rendering and storing only the missing ones"""
+        from .parallel import merge_pages, render_page_pdfs
+
+        keys = [self.page_key(year, month) for year, month in pages]
+        pdfs = [page_cache.get(key) for key in keys]
+        missing = [i for i, pdf in enumerate(pdfs) if pdf is None]
+        if missing:
+            rendered = render_page_pdfs(self, [pages[i] for i in missing], workers)
+            for i, pdf in zip(missing, rendered):
+                page_cache.put(keys[i], pdf)
+                pdfs[i] = pdf
+        
+        with timed(self.listeners, 'build'):
+            merge_pages(pdfs, output_file, dedupe=self.profile['dedupe'])
+        return output_file
+
+def month_span(start, end):
+    """List the (year, month) pages from start to end inclusive.
+
+    start and end may be dates or (year, month) tuples; the span may cross
+    year boundaries.
+    """
+    start_year, start_month = (start.year, start.month) if isinstance(start, date) else start
+    end_year, end_month = (end.year, end.month) if isinstance(end, date) else end
+    if not 1 <= int(start_month) <= 12 or not 1 <= int(end_month) <= 12:
+        raise ValueError('Months must be between 1 and 12')
+    # Count months from year 0 so the span can cross year boundaries
+    first = int(start_year) * 12 + int(start_month) - 1
+    last = int(end_year) * 12 + int(end_month) - 1
+    if last < first:
+        raise ValueError('Range end is before its start')
+    return [(n // 12, n % 12 + 1) for n in range(first, last + 1)]
 
-def generate_calendar(year, csv_file, output_file, styling=None):
-    """Generate a calendar PDF with dynamic sizing"""
+def generate_calendar(year, csv_file, output_file, styling=None, workers=None, months=None):
+    """Generate a calendar PDF with dynamic sizing.
+
+    output_file may be a filesystem path or a binary file-like object
+    (e.g. io.BytesIO), in which case nothing is written to disk. Pass
+    workers > 1 to render months in parallel processes, and months to
+    render only some months of year.
+    """
     calendar_gen = DynamicCalendarGenerator(styling)
     if csv_file:
-        calendar_gen.load_events(csv_file)
-    calendar_gen.generate_calendar(year, output_file)
\ No newline at end of file
+        calendar_gen.load_events(csv_file, years=(year,), strict=True)
+    return calendar_gen.generate_calendar(year, output_file, workers=workers, months=months)
+
+def generate_range(start, end, csv_file, output_file, styling=None, workers=None):
+    """Generate a calendar PDF for the months from start to end inclusive.
+
+    start and end are dates or (year, month) tuples and may lie in
+    different years.
+    """
+    pages = month_span(start, end)
+    calendar_gen = DynamicCalendarGenerator(styling)
+    if csv_file:
+        calendar_gen.load_events(csv_file, years={year for year, _ in pages}, strict=True)
+    return calendar_gen.render_pages(pages, output_file, workers=workers)
+
+def render_calendar_bytes(year, csv_file, styling=None, workers=None, months=None):
+    """Generate a calendar PDF in memory and return the raw bytes"""
+    buffer = io.BytesIO()
+    generate_calendar(year, csv_file, buffer, styling, workers=workers, months=months)
+    return buffer.getvalue()
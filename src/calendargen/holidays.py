@@ -1,7 +1,87 @@
 from datetime import date
+from functools import lru_cache
 from dateutil.easter import easter
-from dateutil.relativedelta import relativedelta, MO, TH, FR
+from dateutil.relativedelta import relativedelta, MO, TU, WE, TH, FR, SA, SU
 
+WEEKDAYS = (MO, TU, WE, TH, FR, SA, SU)
+
+# country name -> function(year) returning {date: holiday name}
+HOLIDAY_REGISTRY = {}
+
+def register_country(name, rules=None):
+    """Register holidays for a country.
+
+    rules may be a function(year) -> {date: name} or a list of rule
+    functions built with fixed(), nth_weekday() and easter_offset().
+    Can also be used as a decorator: @register_country('irish').
+    """
+    def register(rules):
+        if callable(rules):
+            compute = rules
+        else:
+            rule_list = list(rules)
+            def compute(year):
+                return dict(rule(year) for rule in rule_list)
+        HOLIDAY_REGISTRY[name] = compute
+        _cached_holidays.cache_clear()
+        return rules
+
+    if rules is None:
+        return register
+    return register(rules)
+
+def available_countries():
+    return sorted(HOLIDAY_REGISTRY)
+
+def _country_names(country):
+    """Normalize 'us', 'us,uk' or ['us', 'uk'] to a tuple of registered names"""
+    if not country:
+        return ()
+    if isinstance(country, str):
+        country = country.split(',')
+    names = []
+    for name in country:
+        name = name.strip()
+        if name and name != 'none' and name not in names:
+            names.append(name)
+    return tuple(names)
+
+@lru_cache(maxsize=1024)
+def _cached_holidays(countries, year):
+    merged = {}
+    for name in countries:
+        compute = HOLIDAY_REGISTRY.get(name)
+        if compute is None:
+            continue
+        for holiday_date, holiday_name in compute(year).items():
+            existing = merged.get(holiday_date)
+            if existing is None:
+                merged[holiday_date] = holiday_name
+            elif holiday_name not in existing.split(' / '):
+                # Same date in several countries under different names
+                merged[holiday_date] = f'{existing} / {holiday_name}'
+    return merged
+
+# Rule builders for data-driven country definitions
+def fixed(month, day, name):
+    """Holiday on the same date every year"""
+    return lambda year: (date(year, month, day), name)
+
+def nth_weekday(month, weekday, n, name):
+    """nth weekday (0 = Monday) of month; negative n counts from the month end"""
+    def rule(year):
+        if n > 0:
+            start = date(year, month, 1)
+        else:
+            start = date(year, month, 1) + relativedelta(day=31)
+        return start + relativedelta(weekday=WEEKDAYS[weekday](n)), name
+    return rule
+
+def easter_offset(days, name):
+    """Holiday a fixed number of days from Easter Sunday"""
+    return lambda year: (easter(year) + relativedelta(days=days), name)
+
+@register_country('irish')
 def get_irish_holidays(year):
     holidays = {}
     
@@ -26,6 +106,7 @@ def get_irish_holidays(year):
     
     return holidays
 
+@register_country('uk')
 def get_uk_holidays(year):
     holidays = {}
     
@@ -47,6 +128,7 @@ def get_uk_holidays(year):
     
     return holidays
 
+@register_country('us')
 def get_us_holidays(year):
     holidays = {}
     
@@ -77,12 +159,20 @@ def get_us_holidays(year):
     return holidays
 
 def get_holidays(year, country):
-    holiday_functions = {
-        'irish': get_irish_holidays,
-        'uk': get_uk_holidays,
-        'us': get_us_holidays,
+    """Holidays for one country or several merged ('us,uk' or a list)"""
+    # Copy so callers can't modify the memoized table
+    return dict(_cached_holidays(_country_names(country), year))
+
+def get_holidays_range(countries, start_year, end_year):
+    """Precompute holidays for every country and year in an inclusive range.
+
+    Returns {(country, year): {date: name}}.
+    """
+    return {
+        (country, year): get_holidays(year, country)
+        for country in _country_names(countries)
+        for year in range(start_year, end_year + 1)
     }
-    
-    if country in holiday_functions:
-        return holiday_functions[country](year)
-    return {}
\ No newline at end of file
+
+def clear_holiday_cache():
+    _cached_holidays.cache_clear()
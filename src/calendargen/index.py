@@ -0,0 +1,66 @@
+from array import array
+from datetime import date
+
+from .events import Event
+
+_NO_EVENTS = ()
+
+
+class EventIndex:
+    """Per-year day-of-year index of merged events.
+
+    Slot i holds the events for the (i + 1)th day of the year in display
+    order (specific events, then MM-DD recurring events, then rule-based
+    recurrences, then the holiday), with
+    a parallel array of per-day counts so per-month maxima are slice
+    reductions rather than date arithmetic.
+    """
+
+    __slots__ = ('year', 'counts', 'events', '_month_starts')
+
+    def __init__(self, year, recurring_events, specific_events, holidays, rule_events=None):
+        self.year = year
+        year_start = date(year, 1, 1).toordinal()
+        days_in_year = date(year + 1, 1, 1).toordinal() - year_start
+
+        self._month_starts = array('H', (
+            date(year, month, 1).toordinal() - year_start for month in range(1, 13)
+        ))
+        self._month_starts.append(days_in_year)
+
+        slots = [[] for _ in range(days_in_year)]
+
+        # Specific events first, matching the original cell order
+        for event_date, events in specific_events.items():
+            if event_date.year == year:
+                slots[event_date.toordinal() - year_start].extend(events)
+
+        for month, days in recurring_events.items():
+            offset = self._month_starts[month - 1]
+            month_length = self._month_starts[month] - offset
+            for day, events in days.items():
+                # Skip recurrences that don't exist this year (e.g. 02-29)
+                if 1 <= day <= month_length:
+                    slots[offset + day - 1].extend(events)
+
+        # Rule-based recurrences are expanded only within this year
+        if rule_events:
+            first, last = date(year, 1, 1), date(year, 12, 31)
+            for recurrence, events in rule_events.items():
+                for occurrence in recurrence.between(first, last):
+                    slots[occurrence.toordinal() - year_start].extend(events)
+
+        for holiday_date, name in holidays.items():
+            if holiday_date.year == year:
+                slots[holiday_date.toordinal() - year_start].append(Event(name, 'holiday'))
+
+        self.events = [tuple(s) if s else _NO_EVENTS for s in slots]
+        self.counts = array('I', (len(s) for s in slots))
+
+    def day_events(self, month, day):
+        """Merged, ordered events for a day of this year"""
+        return self.events[self._month_starts[month - 1] + day - 1]
+
+    def max_events(self, month):
+        """Largest number of events on any single day in month"""
+        return max(self.counts[self._month_starts[month - 1]:self._month_starts[month]])
@@ -0,0 +1,46 @@
+from contextlib import nullcontext
+from time import perf_counter
+
+# Stages reported to listeners, in pipeline order
+STAGES = ('load', 'holidays', 'index', 'sizing', 'table', 'build')
+
+# Shared no-op used when nobody is listening, so unobserved renders pay
+# only an empty-list check per stage
+_NOT_TIMED = nullcontext()
+
+
+class StageTimer:
+    """Context manager that reports elapsed time for a stage to listeners"""
+
+    __slots__ = ('listeners', 'stage', 'start')
+
+    def __init__(self, listeners, stage):
+        self.listeners = listeners
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = perf_counter() - self.start
+        for listener in self.listeners:
+            listener(self.stage, elapsed)
+        return False
+
+
+def timed(listeners, stage):
+    """Time a stage for listeners, or do nothing if there are none"""
+    if not listeners:
+        return _NOT_TIMED
+    return StageTimer(listeners, stage)
+
+
+class StageTotals:
+    """Listener that sums time per stage (sizing and table run once per month)"""
+
+    def __init__(self):
+        self.totals = {}
+
+    def __call__(self, stage, seconds):
+        self.totals[stage] = self.totals.get(stage, 0.0) + seconds
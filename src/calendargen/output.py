@@ -0,0 +1,62 @@
+from reportlab.pdfbase import pdfdoc
+from reportlab.pdfgen import canvas
+
+# Output profiles trading render time against file size
+#   compression: zlib-compress page and form content streams
+#   ascii85: wrap compressed streams in ASCII85 text (reportlab's default,
+#            about a quarter larger than binary streams)
+#   dedupe: merge identical objects when pages are assembled with pypdf
+# Every profile uses the standard Helvetica fonts, which PDF viewers
+# provide, so no font data is ever embedded.
+OUTPUT_PROFILES = {
+    'fast': {'compression': 0, 'ascii85': False, 'dedupe': False},
+    'standard': {'compression': 1, 'ascii85': True, 'dedupe': False},
+    'small': {'compression': 1, 'ascii85': False, 'dedupe': True},
+}
+
+DEFAULT_PROFILE = 'standard'
+
+def get_profile(name):
+    """Settings for an output profile name (None for the default)"""
+    try:
+        return OUTPUT_PROFILES[name or DEFAULT_PROFILE]
+    except KeyError:
+        raise ValueError(f'Unknown output profile {name!r}, choose from {", ".join(OUTPUT_PROFILES)}')
+
+
+class ProfileCanvas(canvas.Canvas):
+    """Canvas that writes streams with or without ASCII85, regardless of rl_config.
+
+    reportlab picks the filters of page and form streams from the
+    process-wide rl_config.useA85 when the document is written. Each page
+    and form of this canvas gets its stream built with the profile's
+    filters as soon as it is finished instead, so concurrent renders (and
+    forked workers) share no state and need no lock.
+    """
+
+    stream_filters = (pdfdoc.PDFBase85Encode, pdfdoc.PDFZCompress)
+
+    def showPage(self):
+        super().showPage()
+        self._set_stream_filters(self._doc.Pages.pages[-1])
+
+    def endForm(self, **extra_attributes):
+        name = self._formData[0]
+        super().endForm(**extra_attributes)
+        self._set_stream_filters(self._doc.idToObject[pdfdoc.xObjectName(name)])
+
+    def _set_stream_filters(self, obj):
+        # A prebuilt Contents stream is used as is; with compression off
+        # reportlab no longer replaces its filters
+        if obj.compression and obj.stream:
+            obj.Contents = pdfdoc.PDFStream(content=obj.stream, filters=list(self.stream_filters))
+            obj.compression = 0
+
+
+class BinaryStreamCanvas(ProfileCanvas):
+    stream_filters = (pdfdoc.PDFZCompress,)
+
+
+def canvas_class(profile):
+    """Canvas class to draw and save documents with for profile"""
+    return ProfileCanvas if profile['ascii85'] else BinaryStreamCanvas
@@ -0,0 +1,171 @@
+import calendar
+import importlib.util
+import io
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+_executor = None
+_executor_workers = None
+_executor_lock = threading.Lock()
+
+# Seconds to wait for one month page from the pool
+PAGE_TIMEOUT = 120
+
+_process_context = None
+_process_context_lock = threading.Lock()
+
+
+def process_context():
+    """Multiprocessing context for every render process, set up on first use.
+
+    Processes are started by a single-threaded fork server rather than
+    forked from a request thread, so they never inherit a lock another
+    thread held at that moment (logging, caches). The server imports the
+    generator once so each process starts with reportlab loaded. The
+    preload list is process-wide, so the pool and web jobs both take
+    their context from here. Platforms without forkserver use spawn.
+    """
+    global _process_context
+    with _process_context_lock:
+        if _process_context is None:
+            if 'forkserver' in multiprocessing.get_all_start_methods():
+                context = multiprocessing.get_context('forkserver')
+                context.set_forkserver_preload([f'{__package__}.generator'])
+            else:
+                context = multiprocessing.get_context('spawn')
+            _process_context = context
+        return _process_context
+
+
+def _require_pypdf():
+    try:
+        import pypdf
+    except ImportError:
+        raise RuntimeError('Parallel rendering requires pypdf (pip install pypdf)')
+    return pypdf
+
+
+def have_pypdf():
+    """True when pypdf is installed, so pages can be merged (without importing it)"""
+    return importlib.util.find_spec('pypdf') is not None
+
+
+def default_workers():
+    """Worker count used when parallel rendering is enabled without a number"""
+    return min(12, os.cpu_count() or 1)
+
+
+def get_executor(workers):
+    """Return a process pool shared across calls, resized when workers changes"""
+    global _executor, _executor_workers
+    with _executor_lock:
+        if _executor is None or _executor_workers != workers:
+            if _executor is not None:
+                _executor.shutdown(wait=False)
+            _executor = ProcessPoolExecutor(max_workers=workers, mp_context=process_context())
+            _executor_workers = workers
+        return _executor
+
+
+def shutdown_executor():
+    global _executor, _executor_workers
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown()
+        _executor = None
+        _executor_workers = None
+
+
+def month_state(calendar_gen, year, month):
+    """Picklable slice of generator state needed to render one month"""
+    recurring = {}
+    if month in calendar_gen.recurring_events:
+        recurring[month] = calendar_gen.recurring_events[month]
+    specific = {d: events for d, events in calendar_gen.specific_events.items()
+                if d.year == year and d.month == month}
+    holidays = {d: name for d, name in calendar_gen.holidays.items()
+                if d.year == year and d.month == month}
+    first, last = date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1])
+    rules = {r: events for r, events in calendar_gen.rule_events.items() if r.between(first, last)}
+    return calendar_gen.styling, recurring, specific, holidays, rules
+
+
+def render_month_page(state, year, month):
+    """Worker entry point: render a single month page and return its PDF bytes"""
+    from .generator import DynamicCalendarGenerator
+
+    styling, recurring, specific, holidays, rules = state
+    calendar_gen = DynamicCalendarGenerator(styling)
+    calendar_gen.recurring_events = recurring
+    calendar_gen.specific_events = specific
+    calendar_gen.holidays = holidays
+    calendar_gen.rule_events = rules
+    calendar_gen.year = year
+
+    buffer = io.BytesIO()
+    doc = calendar_gen.create_document(buffer)
+    calendar_gen.build_document(doc, calendar_gen.build_month_story(year, month, doc))
+    return buffer.getvalue()
+
+
+def merge_pages(page_pdfs, output_file, dedupe=False):
+    """Concatenate single-month PDFs, in order, into output_file.
+
+    With dedupe, objects repeated across pages (fonts, grid forms) are
+    written once; this needs pypdf 4.3 or later and is skipped otherwise.
+    """
+    pypdf = _require_pypdf()
+    writer = pypdf.PdfWriter()
+    for pdf_bytes in page_pdfs:
+        reader = pypdf.PdfReader(io.BytesIO(pdf_bytes))
+        for page in reader.pages:
+            writer.add_page(page)
+    if dedupe and hasattr(writer, 'compress_identical_objects'):
+        writer.compress_identical_objects()
+    writer.write(output_file)
+    return output_file
+
+
+def render_page_pdfs(calendar_gen, pages, workers=None):
+    """Render each (year, month) page as its own single-page PDF.
+
+    With workers > 1 the platypus pages are rendered in the shared process
+    pool; otherwise (and for the canvas engine) they are rendered in turn.
+    """
+    if workers and workers > 1 and calendar_gen.engine != 'canvas':
+        executor = get_executor(workers)
+        futures = [
+            executor.submit(render_month_page, month_state(calendar_gen, year, month), year, month)
+            for year, month in calendar_gen.prepared_pages(pages)
+        ]
+        return [f.result(timeout=PAGE_TIMEOUT) for f in futures]
+
+    page_pdfs = []
+    for page in pages:
+        buffer = io.BytesIO()
+        calendar_gen.render_pages([page], buffer)
+        page_pdfs.append(buffer.getvalue())
+    return page_pdfs
+
+
+def render_months_parallel(calendar_gen, pages, output_file, workers=None):
+    """Render each (year, month) page in a worker process and merge them in order"""
+    _require_pypdf()
+    workers = workers or default_workers()
+    page_pdfs = render_page_pdfs(calendar_gen, pages, workers)
+    return merge_pages(page_pdfs, output_file, dedupe=calendar_gen.profile['dedupe'])
+
+
+def page_contents(pdf_bytes):
+    """Decoded content stream of each page, for comparing render paths"""
+    pypdf = _require_pypdf()
+    reader = pypdf.PdfReader(io.BytesIO(pdf_bytes))
+    return [page.get_contents().get_data() for page in reader.pages]
+
+
+def equivalent_output(pdf_a, pdf_b):
+    """True when both PDFs draw identical page content in the same order"""
+    return page_contents(pdf_a) == page_contents(pdf_b)
@@ -0,0 +1,112 @@
+import calendar as cal
+from xml.sax.saxutils import escape
+
+from .canvas_engine import CanvasRenderer
+
+FONT_FAMILY = 'Helvetica, Arial, sans-serif'
+
+
+def _hex(color):
+    return '#' + color.hexval()[2:]
+
+
+def _num(value):
+    return f'{value:.2f}'.rstrip('0').rstrip('.')
+
+
+def _text(x, y, font_name, font_size, fill, text, anchor=None):
+    attrs = f'x="{_num(x)}" y="{_num(y)}" font-size="{_num(font_size)}" fill="{fill}"'
+    if font_name.endswith('-Bold'):
+        attrs += ' font-weight="bold"'
+    if anchor:
+        attrs += f' text-anchor="{anchor}"'
+    return f'<text {attrs}>{escape(text)}</text>'
+
+
+class SvgPreview:
+    """Draws one month page as SVG with the same layout as the PDF engines.
+
+    Font sizes come from calculate_optimal_sizes and positions from the
+    canvas engine's geometry, static layer and text wrapping, so the
+    preview matches the downloaded page without building a PDF.
+    """
+
+    def __init__(self, calendar_gen):
+        self.gen = calendar_gen
+        self.renderer = CanvasRenderer(calendar_gen)
+        self.height = self.renderer.page_height
+
+    def y(self, y):
+        # PDF coordinates start at the bottom of the page, SVG at the top
+        return self.height - y
+
+    def render(self, year, month):
+        gen = self.gen
+        renderer = self.renderer
+        gen.prepare_year(year)
+        header_size, event_size = gen.calculate_optimal_sizes(year, month, renderer.available_height)
+        geometry = renderer.geometry(len(gen.calendar.monthdayscalendar(year, month)))
+        # The platypus table does not shade weekends, only the canvas engine does
+        layer = renderer.static_layer(geometry, event_size * 1.1, weekends=gen.engine == 'canvas')
+
+        width, height = renderer.page_width, renderer.page_height
+        parts = [
+            f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {_num(width)} {_num(height)}" '
+            f'width="{_num(width)}" height="{_num(height)}" font-family="{FONT_FAMILY}">',
+            f'<rect width="{_num(width)}" height="{_num(height)}" fill="#ffffff"/>',
+            _text(width / 2, self.y(renderer.header_top - header_size), 'Helvetica', header_size,
+                  '#000000', f'{cal.month_name[month]} {year}', anchor='middle'),
+        ]
+        parts.extend(self.static_layer(layer.ops))
+        for color_key, font_name, font_size, x, lines in renderer.text_runs(year, month, geometry, event_size):
+            fill = _hex(renderer.color[color_key])
+            for y, line in lines:
+                parts.append(_text(x, self.y(y), font_name, font_size, fill, line))
+        parts.append('</svg>')
+        return '\n'.join(parts)
+
+    def static_layer(self, ops):
+        """Translate a canvas engine static layer into SVG elements"""
+        fill = stroke = '#000000'
+        line_width = 1
+        font = ('Helvetica', 12)
+        clipped = False
+        for op, *args in ops:
+            if op == 'fill':
+                fill = _hex(args[0])
+            elif op == 'stroke':
+                stroke = _hex(args[0])
+            elif op == 'width':
+                line_width = args[0]
+            elif op == 'font':
+                font = args
+            elif op == 'clip':
+                x, y, w, h, radius = args
+                yield (f'<clipPath id="grid-clip"><rect x="{_num(x)}" y="{_num(self.y(y + h))}" '
+                       f'width="{_num(w)}" height="{_num(h)}" rx="{_num(radius)}"/></clipPath>')
+                yield '<g clip-path="url(#grid-clip)">'
+                clipped = True
+            elif op == 'restore' and clipped:
+                yield '</g>'
+                clipped = False
+            elif op == 'rect':
+                x, y, w, h = args
+                yield (f'<rect x="{_num(x)}" y="{_num(self.y(y + h))}" width="{_num(w)}" '
+                       f'height="{_num(h)}" fill="{fill}"/>')
+            elif op == 'lines':
+                path = ' '.join(f'M{_num(x1)} {_num(self.y(y1))}L{_num(x2)} {_num(self.y(y2))}'
+                                for x1, y1, x2, y2 in args[0])
+                yield f'<path d="{path}" stroke="{stroke}" stroke-width="{_num(line_width)}" fill="none"/>'
+            elif op == 'outline':
+                x, y, w, h, radius = args
+                yield (f'<rect x="{_num(x)}" y="{_num(self.y(y + h))}" width="{_num(w)}" '
+                       f'height="{_num(h)}" rx="{_num(radius)}" stroke="{stroke}" '
+                       f'stroke-width="{_num(line_width)}" fill="none"/>')
+            elif op == 'text':
+                x, y, text = args
+                yield _text(x, self.y(y), font[0], font[1], fill, text)
+
+
+def render_month_svg(calendar_gen, year, month):
+    """SVG preview of one month page, sized like the PDF"""
+    return SvgPreview(calendar_gen).render(year, month)
@@ -0,0 +1,76 @@
+from functools import lru_cache
+
+from reportlab.lib import colors
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+
+# Distinct (color scheme, header size, event size) combinations kept alive
+STYLE_CACHE_SIZE = 256
+
+
+@lru_cache(maxsize=STYLE_CACHE_SIZE)
+def get_style_sheet(color_scheme, header_size=24, event_size=10):
+    """Shared stylesheet for a color scheme and font sizes.
+
+    Built once per key and reused across months, generator instances and
+    requests, so the returned styles must be treated as read-only.
+    """
+    from .generator import COLOR_SCHEMES
+
+    scheme = COLOR_SCHEMES[color_scheme]
+    styles = getSampleStyleSheet()
+
+    # Modern header style
+    styles.add(ParagraphStyle(
+        name='MonthHeader',
+        fontSize=header_size,
+        alignment=1,
+        spaceAfter=15,
+        fontName='Helvetica-Bold',
+        textColor=colors.HexColor(scheme['header_text']),
+        leading=header_size * 1.2
+    ))
+
+    # Page title above each month table
+    styles.add(ParagraphStyle(
+        name='PageHeader',
+        fontSize=header_size,
+        alignment=1,
+        spaceAfter=20
+    ))
+
+    # Clean event text style
+    styles.add(ParagraphStyle(
+        name='EventText',
+        fontSize=event_size,
+        fontName='Helvetica',
+        textColor=colors.HexColor(scheme['event_text']),
+        leading=event_size * 1.3,
+        spaceBefore=2,
+        spaceAfter=2
+    ))
+
+    # Holiday events use the event style in the scheme's holiday color
+    styles.add(ParagraphStyle(
+        name='HolidayText',
+        parent=styles['EventText'],
+        textColor=colors.HexColor(scheme['holiday_text'])
+    ))
+
+    # Day number style
+    styles.add(ParagraphStyle(
+        name='DayNumber',
+        fontSize=event_size * 1.2,
+        fontName='Helvetica-Bold',
+        textColor=colors.HexColor(scheme['day_number']),
+        alignment=0  # Left align
+    ))
+
+    return styles
+
+
+def style_cache_info():
+    return get_style_sheet.cache_info()
+
+
+def clear_style_cache():
+    get_style_sheet.cache_clear()
@@ -0,0 +1,58 @@
+import io
+import time
+from datetime import date
+
+from .cache import RenderCache
+from .generator import DynamicCalendarGenerator, COLOR_SCHEMES
+from .holidays import available_countries, get_holidays_range
+from .parallel import have_pypdf
+from .preview import render_month_svg
+from .styles import get_style_sheet
+
+# Years either side of the warm-up year whose holiday tables are primed
+WARMUP_YEARS_AROUND = 1
+
+WARMUP_EVENTS = 'date,event,type\n01-01,Warm-up,other\n'
+
+
+def warm_up(year=None, engines=('platypus', 'canvas')):
+    """Pay first-use costs up front and return seconds spent per step.
+
+    Imports reportlab, primes the holiday tables for every country around
+    year, builds the default style sheet of every color scheme, and
+    renders one month per engine (plus an SVG preview and a page merge)
+    into memory, which loads font metrics and exercises the layout code
+    paths. Run it in the parent process before forking (gunicorn
+    --preload) so every worker starts warm.
+    """
+    year = year or date.today().year
+    timings = {}
+
+    start = time.perf_counter()
+    for country in available_countries():
+        get_holidays_range(country, year - WARMUP_YEARS_AROUND, year + WARMUP_YEARS_AROUND)
+    timings['holidays'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for scheme in COLOR_SCHEMES:
+        get_style_sheet(scheme)
+    timings['styles'] = time.perf_counter() - start
+
+    for engine in engines:
+        start = time.perf_counter()
+        calendar_gen = DynamicCalendarGenerator({'engine': engine, 'holidays': available_countries()[0]})
+        calendar_gen.load_events(io.StringIO(WARMUP_EVENTS), years=(year,))
+        calendar_gen.generate_calendar(year, io.BytesIO(), months=[1])
+        timings[f'render_{engine}'] = time.perf_counter() - start
+
+    if engines:
+        start = time.perf_counter()
+        render_month_svg(calendar_gen, year, 1)
+        timings['preview'] = time.perf_counter() - start
+
+        if have_pypdf():
+            # Loads pypdf, used to assemble documents from cached pages
+            start = time.perf_counter()
+            calendar_gen.generate_calendar(year, io.BytesIO(), months=[1], page_cache=RenderCache(max_entries=1))
+            timings['merge'] = time.perf_counter() - start
+    return timings
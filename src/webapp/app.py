@@ -1,101 +1,471 @@
 import os
-from flask import Flask, render_template, request, send_file, flash
-from werkzeug.utils import secure_filename
-import tempfile
+from flask import Flask, Request, render_template, request, flash, Response, url_for, g
+from werkzeug.exceptions import RequestEntityTooLarge
 from datetime import datetime
 import csv
 import io
-from src.calendargen.generator import generate_calendar  # Updated import path
+import time
+# reportlab-backed modules (generator, preview, warmup) are imported where
+# they are used, so the app starts and answers /health without loading them
+from src.calendargen.cache import RenderCache, make_event_set_key
+from src.calendargen.parallel import have_pypdf
+from src.calendargen.instrument import StageTotals
+from src.webapp import metrics
+from src.webapp.eventstore import EventStore, UnknownEventSet
+from src.webapp.jobs import JobManager, JobQueueFull
+from src.webapp.singleflight import SingleFlight
+
+
+
+class InMemoryRequest(Request):
+    """Request that keeps uploaded files in memory instead of spooling
+    large ones to a temporary file; MAX_CONTENT_LENGTH bounds their size"""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return io.BytesIO()
+
 
 app = Flask(__name__)
+app.request_class = InMemoryRequest
 app.secret_key = os.environ.get('SECRET_KEY', 'dev-secret-key')
 
 # Configuration
 ALLOWED_EXTENSIONS = {'csv'}
-TEMP_DIR = tempfile.gettempdir()
+# Largest request body accepted, checked against Content-Length before
+# the body is read; uploads and pasted CSV are parsed from memory
+MAX_CONTENT_LENGTH = int(os.environ.get('MAX_CONTENT_LENGTH', 2 * 1024 * 1024))
+app.config['MAX_CONTENT_LENGTH'] = MAX_CONTENT_LENGTH
+app.config['MAX_FORM_MEMORY_SIZE'] = MAX_CONTENT_LENGTH
+# Most CSV rows one request may submit; loading stops at the first row over
+MAX_EVENT_ROWS = int(os.environ.get('MAX_EVENT_ROWS', 20000))
+# Render months in this many worker processes (0 or 1 renders serially)
+RENDER_WORKERS = int(os.environ.get('RENDER_WORKERS', 0))
+# Output profile for every render: 'fast', 'standard' or 'small' trades
+# CPU time against download size
+OUTPUT_PROFILE = os.environ.get('OUTPUT_PROFILE', 'standard')
+# Longest month range a single request may render
+MAX_RANGE_MONTHS = int(os.environ.get('MAX_RANGE_MONTHS', 36))
 
-# Cleanup function for temporary files
-def cleanup_temp_file(filepath):
-    try:
-        if os.path.exists(filepath):
-            os.remove(filepath)
-    except Exception:
-        pass
+# Rendered PDF cache (memory LRU plus optional disk tier)
+render_cache_dir = os.environ.get('RENDER_CACHE_DIR') or None
+render_cache = RenderCache(
+    max_entries=int(os.environ.get('RENDER_CACHE_ENTRIES', 64)),
+    max_bytes=int(os.environ.get('RENDER_CACHE_BYTES', 64 * 1024 * 1024)),
+    disk_dir=render_cache_dir,
+    disk_max_bytes=int(os.environ.get('RENDER_CACHE_DISK_BYTES', 512 * 1024 * 1024)),
+)
+
+# Identical concurrent renders run once and share the bytes. With a disk
+# cache the lock extends across worker processes on this host.
+render_flight = SingleFlight(
+    timeout=float(os.environ.get('SINGLEFLIGHT_TIMEOUT', 120)),
+    lock_dir=os.environ.get('SINGLEFLIGHT_LOCK_DIR') or (
+        os.path.join(render_cache_dir, 'locks') if render_cache_dir else None),
+)
+
+# Single month pages that documents are assembled from, so editing one
+# month re-renders only that page. Opt in with PAGE_CACHE_ENTRIES > 0 (needs
+# pypdf): assembled documents are larger and slower to build cold than a
+# direct render, so this pays off only when users re-render with small edits.
+PAGE_CACHE_ENTRIES = int(os.environ.get('PAGE_CACHE_ENTRIES', 0))
+page_cache = None
+if PAGE_CACHE_ENTRIES > 0 and have_pypdf():
+    page_cache = RenderCache(
+        max_entries=PAGE_CACHE_ENTRIES,
+        max_bytes=int(os.environ.get('PAGE_CACHE_BYTES', 32 * 1024 * 1024)),
+    )
+
+# SVG month previews, small enough to keep many per form state
+preview_cache = RenderCache(
+    max_entries=int(os.environ.get('PREVIEW_CACHE_ENTRIES', 256)),
+    max_bytes=int(os.environ.get('PREVIEW_CACHE_BYTES', 8 * 1024 * 1024)),
+)
+
+# Saved event sets (see /events): clients upload a CSV once and generate
+# calendars from its id
+event_store = EventStore(
+    os.environ.get('EVENT_STORE_PATH') or os.path.join(app.instance_path, 'events.sqlite3'),
+    max_events=MAX_EVENT_ROWS,
+)
+
+# Background render jobs for the async /jobs API
+job_manager = JobManager(
+    workers=int(os.environ.get('JOB_WORKERS', 2)),
+    max_queue=int(os.environ.get('JOB_MAX_QUEUE', 32)),
+    timeout=float(os.environ.get('JOB_TIMEOUT', 120)),
+    result_ttl=float(os.environ.get('JOB_RESULT_TTL', 600)),
+    cache=render_cache,
+    max_results=int(os.environ.get('JOB_MAX_RESULTS', 256)),
+    max_result_bytes=int(os.environ.get('JOB_RESULT_BYTES', 128 * 1024 * 1024)),
+)
+
+def warm_up():
+    """Load reportlab and prime caches before the first request.
+
+    Set WARMUP=1 with gunicorn --preload so this runs once in the master
+    and forked workers start warm.
+    """
+    from src.calendargen.warmup import warm_up as warm_up_generator
+
+    start = time.perf_counter()
+    timings = warm_up_generator()
+    app.logger.info('Warm-up finished in %.0f ms (%s)', (time.perf_counter() - start) * 1000,
+                    ', '.join(f'{step} {seconds * 1000:.0f} ms' for step, seconds in timings.items()))
+    return timings
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def pdf_response(pdf_bytes, filename, etag=None, profile=None):
+    """Build a PDF download response straight from in-memory bytes"""
+    response = Response(pdf_bytes, mimetype='application/pdf')
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+    response.content_length = len(pdf_bytes)
+    # Size survives proxies that re-encode or chunk the body
+    response.headers['X-Output-Size'] = str(len(pdf_bytes))
+    if profile:
+        response.headers['X-Output-Profile'] = profile
+    if etag:
+        response.set_etag(etag)
+    return response
+
+def not_modified_response(etag):
+    response = Response(status=304)
+    response.set_etag(etag)
+    return response
+
+def pdf_filename(year, pages):
+    if len(pages) == 12 and pages[0] == (year, 1):
+        return f'calendar_{year}.pdf'
+    (first_year, first_month), (last_year, last_month) = pages[0], pages[-1]
+    if pages[0] == pages[-1]:
+        return f'calendar_{first_year}-{first_month:02d}.pdf'
+    return f'calendar_{first_year}-{first_month:02d}_{last_year}-{last_month:02d}.pdf'
+
+def build_generator(years, events, styling):
+    from src.calendargen.generator import DynamicCalendarGenerator
+
+    calendar_gen = DynamicCalendarGenerator(styling)
+    # Collected per request for Server-Timing and /metrics
+    g.stage_totals = calendar_gen.add_listener(StageTotals())
+    if events:
+        # Only keep dated events for the years being rendered
+        calendar_gen.load_events(events, years=years, strict=True, max_rows=MAX_EVENT_ROWS)
+    return calendar_gen
+
+def document_key(key):
+    """Render cache key and ETag for a document served by the form.
+
+    Documents assembled from cached pages draw the same content as direct
+    renders but differ in bytes, so they are cached and tagged apart.
+    """
+    return f'{key}-pages' if page_cache is not None else key
+
+def render_cached(calendar_gen, pages, key):
+    """Return PDF bytes for key, reusing a cached or in-flight render when inputs match"""
+    pdf_bytes = render_cache.get(key)
+    if pdf_bytes is None:
+        def render():
+            buffer = io.BytesIO()
+            calendar_gen.render_pages(pages, buffer, workers=RENDER_WORKERS, page_cache=page_cache)
+            render_cache.put(key, buffer.getvalue())
+            return buffer.getvalue()
+
+        pdf_bytes = render_flight.do(key, render, recheck=lambda: render_cache.get(key))
+    return pdf_bytes
+
+def _cache_metrics():
+    lines = []
+    for prefix, cache in (('render_cache', render_cache), ('page_cache', page_cache)):
+        if cache is None:
+            continue
+        stats = cache.stats()
+        for name in ('hits', 'disk_hits', 'misses', 'evictions', 'disk_evictions'):
+            metric = f'calendar_{prefix}_{name}_total'
+            lines += [f'# TYPE {metric} counter', f'{metric} {stats[name]}']
+        for name in ('entries', 'bytes'):
+            metric = f'calendar_{prefix}_{name}'
+            lines += [f'# TYPE {metric} gauge', f'{metric} {stats[name]}']
+    return lines
+
+def _singleflight_metrics():
+    stats = render_flight.stats()
+    return [
+        '# TYPE calendar_singleflight_leaders_total counter',
+        f'calendar_singleflight_leaders_total {stats["leaders"]}',
+        '# HELP calendar_coalesced_requests_total Renders served by an identical in-flight render',
+        '# TYPE calendar_coalesced_requests_total counter',
+        f'calendar_coalesced_requests_total{{scope="thread"}} {stats["coalesced"]}',
+        f'calendar_coalesced_requests_total{{scope="process"}} {stats["process_coalesced"]}',
+        f'calendar_coalesced_requests_total{{scope="recheck"}} {stats["rechecked"]}',
+        '# TYPE calendar_singleflight_timeouts_total counter',
+        f'calendar_singleflight_timeouts_total {stats["timeouts"]}',
+        '# TYPE calendar_singleflight_in_flight gauge',
+        f'calendar_singleflight_in_flight {stats["in_flight"]}',
+    ]
+
+metrics.registry.add_collector(_cache_metrics)
+metrics.registry.add_collector(_singleflight_metrics)
+
+@app.before_request
+def start_timer():
+    g.request_start = time.perf_counter()
+    g.stage_totals = None
+
+@app.after_request
+def record_metrics(response):
+    start = g.get('request_start')
+    if start is None:
+        return response
+    elapsed = time.perf_counter() - start
+    endpoint = request.endpoint or 'unknown'
+    metrics.requests_total.inc(endpoint, str(response.status_code))
+    metrics.request_seconds.observe(elapsed, endpoint)
+
+    stage_totals = g.get('stage_totals')
+    if stage_totals is not None and stage_totals.totals:
+        for stage, seconds in stage_totals.totals.items():
+            metrics.stage_seconds.observe(seconds, stage)
+        response.headers['Server-Timing'] = metrics.server_timing(stage_totals.totals, elapsed)
+
+    if response.mimetype == 'application/pdf' and response.content_length:
+        metrics.output_bytes.observe(response.content_length, response.headers.get('X-Output-Profile', 'unknown'))
+    return response
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus text exposition of request, stage and cache metrics"""
+    return Response(metrics.registry.render(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/health')
 def health_check():
     """Health check endpoint for Koyeb"""
     return {'status': 'healthy'}, 200
 
+@app.route('/cache/stats')
+def cache_stats():
+    """Render cache hit/miss/eviction counters"""
+    stats = render_cache.stats()
+    stats['pages'] = page_cache.stats() if page_cache is not None else None
+    stats['singleflight'] = render_flight.stats()
+    return stats, 200
+
+@app.route('/jobs/stats')
+def jobs_stats():
+    return job_manager.stats(), 200
+
+def parse_styling(form):
+    """Normalize the calendar form fields into a styling dict"""
+    return {
+        'header_size': int(form.get('header_size', 24)),
+        'event_size': int(form.get('event_size', 10)),
+        'color_scheme': form.get('color_scheme', 'minimal'),
+        'cell_padding': float(form.get('cell_padding', 3)),
+        'grid_width': float(form.get('grid_width', 0.5)),
+        'corner_radius': float(form.get('corner_radius', 2)),
+        'orientation': form.get('orientation', 'P'),
+        'paper_size': form.get('paper_size', 'A4'),
+        'weekstart': form.get('weekstart', '0'),
+        # Several countries may be selected and are merged
+        'holidays': ','.join(form.getlist('holidays')) or 'none',
+        'show_weekends': form.get('show_weekends') == 'on',
+        'compact_mode': form.get('compact_mode') == 'true',
+        'engine': form.get('engine', 'platypus'),
+        'output_profile': OUTPUT_PROFILE
+    }
+
+def _parse_month(value):
+    """'YYYY-MM' (as sent by month inputs) to (year, month)"""
+    year, month = value.split('-')[:2]
+    return int(year), int(month)
+
+def parse_pages(form, year):
+    """Pages to render: the whole year, or the start_month..end_month range"""
+    start, end = form.get('start_month'), form.get('end_month')
+    if not start and not end:
+        return [(year, month) for month in range(1, 13)]
+    from src.calendargen.generator import month_span
+
+    start = _parse_month(start) if start else (year, 1)
+    end = _parse_month(end) if end else start
+    pages = month_span(start, end)
+    if len(pages) > MAX_RANGE_MONTHS:
+        raise ValueError(f'At most {MAX_RANGE_MONTHS} months can be generated at once')
+    return pages
+
+def request_events():
+    """The uploaded or pasted CSV of the request as an in-memory stream, or None"""
+    if 'file' in request.files and request.files['file'].filename:
+        file = request.files['file']
+        if file and allowed_file(file.filename):
+            return file.stream
+    elif csv_text := request.form.get('csv_text'):
+        return io.StringIO(csv_text, newline='')
+    return None
+
+def prepare_calendar():
+    """Parse the submitted form and events into (year, pages, generator, etag)"""
+    year = int(request.form.get('year', datetime.now().year))
+    pages = parse_pages(request.form, year)
+    full_year = pages == [(year, month) for month in range(1, 13)]
+    years = {y for y, _ in pages}
+    styling = parse_styling(request.form)
+
+    if set_id := request.form.get('event_set'):
+        # Only the stored events that can fall in these years are read, and
+        # the set's version keys the render instead of a hash of the events
+        version, rows = event_store.rows_for_years(set_id, years)
+        calendar_gen = build_generator(years, rows, styling)
+        return year, pages, calendar_gen, make_event_set_key(set_id, version, year, styling,
+                                                             None if full_year else pages)
+
+    # Parse the upload or pasted CSV text straight from memory
+    calendar_gen = build_generator(years, request_events(), styling)
+
+    # The cache key doubles as a strong ETag
+    return year, pages, calendar_gen, calendar_gen.cache_key(year, None if full_year else pages)
+
+def event_set_response(info, status=200):
+    info['url'] = url_for('event_set', set_id=info['id'])
+    return info, status
+
+@app.route('/events', methods=['POST'])
+def create_event_set():
+    """Store an uploaded or pasted CSV and return the id to generate calendars from"""
+    events = request_events()
+    if events is None:
+        return {'error': 'No events CSV supplied'}, 400
+    try:
+        info = event_store.create(events)
+    except ValueError as e:
+        return {'error': f'Error storing events: {str(e)}'}, 400
+    return event_set_response(info, 201)
+
+@app.route('/events/<set_id>', methods=['GET', 'POST', 'DELETE'])
+def event_set(set_id):
+    """Show a stored event set with its events, add events from a CSV, or delete it"""
+    try:
+        if request.method == 'DELETE':
+            event_store.delete(set_id)
+            return '', 204
+        if request.method == 'POST':
+            events = request_events()
+            if events is None:
+                return {'error': 'No events CSV supplied'}, 400
+            return event_set_response(event_store.add(set_id, events))
+        info = event_store.info(set_id)
+        info['items'] = event_store.list_events(set_id)
+        return event_set_response(info)
+    except UnknownEventSet as e:
+        return {'error': str(e)}, 404
+    except ValueError as e:
+        return {'error': f'Error storing events: {str(e)}'}, 400
+
+@app.route('/events/<set_id>/<int:event_id>', methods=['DELETE'])
+def remove_event(set_id, event_id):
+    """Remove one event (by the id listed in the set) from a stored set"""
+    try:
+        return event_set_response(event_store.remove(set_id, event_id))
+    except UnknownEventSet as e:
+        return {'error': str(e)}, 404
+    except KeyError:
+        return {'error': f'Unknown event {event_id} in set {set_id!r}'}, 404
+
+@app.errorhandler(RequestEntityTooLarge)
+def request_too_large(e):
+    message = f'Upload too large: requests are limited to {MAX_CONTENT_LENGTH // 1024} KB'
+    if request.endpoint == 'index':
+        flash(message)
+        return render_template('index.html', current_year=datetime.now().year), 413
+    return {'error': message}, 413
+
+@app.route('/preview', methods=['POST'])
+def preview():
+    """One month as SVG, laid out like the PDF, for live previews of the form.
+
+    Shows the first month being generated, or preview_month (YYYY-MM).
+    """
+    try:
+        year, pages, calendar_gen, _ = prepare_calendar()
+        page = _parse_month(request.form['preview_month']) if request.form.get('preview_month') else pages[0]
+        if page not in pages:
+            raise ValueError('Preview month is outside the months being generated')
+    except RequestEntityTooLarge:
+        raise
+    except Exception as e:
+        return {'error': f'Error previewing calendar: {str(e)}'}, 400
+
+    key = calendar_gen.page_key(*page)
+    if request.if_none_match.contains(key):
+        return not_modified_response(key)
+    svg = preview_cache.get(key)
+    if svg is None:
+        from src.calendargen.preview import render_month_svg
+
+        svg = render_month_svg(calendar_gen, *page).encode('utf-8')
+        preview_cache.put(key, svg)
+    response = Response(svg, mimetype='image/svg+xml')
+    response.set_etag(key)
+    return response
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    """Queue a calendar render and return its job id immediately"""
+    try:
+        year, pages, calendar_gen, etag = prepare_calendar()
+    except RequestEntityTooLarge:
+        raise
+    except Exception as e:
+        return {'error': f'Error generating calendar: {str(e)}'}, 400
+
+    try:
+        job = job_manager.submit(etag, calendar_gen, year, pages)
+    except JobQueueFull as e:
+        return {'error': f'Too many pending jobs: {str(e)}'}, 429
+
+    info = job.to_dict()
+    info['status_url'] = url_for('job_status', job_id=job.id)
+    info['download_url'] = url_for('job_download', job_id=job.id)
+    return info, 202
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return {'error': 'Unknown or expired job'}, 404
+    return job.to_dict(), 200
+
+@app.route('/jobs/<job_id>/download')
+def job_download(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return {'error': 'Unknown or expired job'}, 404
+    if job.status != 'done':
+        return job.to_dict(), 409
+    if request.if_none_match.contains(job.key):
+        return not_modified_response(job.key)
+    return pdf_response(job.result, pdf_filename(job.year, job.pages), job.key, job.profile)
+
 @app.route('/', methods=['GET', 'POST'])
 def index():
     if request.method == 'POST':
-        year = int(request.form.get('year', datetime.now().year))
-        csv_path = None
-        pdf_path = None
-        
         try:
-            # Handle file upload or CSV text
-            if 'file' in request.files and request.files['file'].filename:
-                file = request.files['file']
-                if file and allowed_file(file.filename):
-                    csv_path = os.path.join(TEMP_DIR, secure_filename(file.filename))
-                    file.save(csv_path)
-            elif csv_text := request.form.get('csv_text'):
-                csv_path = os.path.join(TEMP_DIR, f'calendar_events_{datetime.now().timestamp()}.csv')
-                with open(csv_path, 'w', newline='') as f:
-                    f.write(csv_text)
-
-            # Generate PDF
-            pdf_filename = f'calendar_{year}.pdf'
-            pdf_path = os.path.join(TEMP_DIR, pdf_filename)
-            
-            styling = {
-                'header_size': int(request.form.get('header_size', 24)),
-                'event_size': int(request.form.get('event_size', 10)),
-                'color_scheme': request.form.get('color_scheme', 'minimal'),
-                'cell_padding': float(request.form.get('cell_padding', 3)),
-                'grid_width': float(request.form.get('grid_width', 0.5)),
-                'corner_radius': float(request.form.get('corner_radius', 2)),
-                'orientation': request.form.get('orientation', 'P'),
-                'paper_size': request.form.get('paper_size', 'A4'),
-                'weekstart': request.form.get('weekstart', '0'),
-                'holidays': request.form.get('holidays', 'none'),
-                'show_weekends': request.form.get('show_weekends') == 'on',
-                'compact_mode': request.form.get('compact_mode') == 'true'
-            }
-
-            generate_calendar(year, csv_path, pdf_path, styling)
-
-            # Clean up CSV file immediately
-            if csv_path:
-                cleanup_temp_file(csv_path)
-
-            # Send PDF and clean up
-            response = send_file(
-                pdf_path,
-                as_attachment=True,
-                download_name=pdf_filename,
-                mimetype='application/pdf'
-            )
-            
-            @response.call_on_close
-            def cleanup():
-                cleanup_temp_file(pdf_path)
-
-            return response
+            year, pages, calendar_gen, etag = prepare_calendar()
+            etag = document_key(etag)
+            if request.if_none_match.contains(etag):
+                return not_modified_response(etag)
+
+            # Generate PDF in memory (or reuse a cached render)
+            pdf_bytes = render_cached(calendar_gen, pages, etag)
+            return pdf_response(pdf_bytes, pdf_filename(year, pages), etag, calendar_gen.output_profile)
 
+        except RequestEntityTooLarge:
+            raise
         except Exception as e:
-            # Clean up files in case of error
-            if csv_path:
-                cleanup_temp_file(csv_path)
-            if pdf_path:
-                cleanup_temp_file(pdf_path)
             flash(f'Error generating calendar: {str(e)}')
             return render_template('index.html', current_year=datetime.now().year)
 
     return render_template('index.html', current_year=datetime.now().year)
 
+if os.environ.get('WARMUP') == '1':
+    warm_up()
@@ -0,0 +1,221 @@
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from src.calendargen.events import EventLimitError, EventLoadError, Recurrence, iter_events
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS event_sets (
+    id TEXT PRIMARY KEY,
+    version INTEGER NOT NULL,
+    created REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    set_id TEXT NOT NULL REFERENCES event_sets (id) ON DELETE CASCADE,
+    -- YYYY-MM-DD of dated events and the first occurrence of rules
+    date TEXT,
+    -- MM-DD events recurring every year
+    month INTEGER,
+    day INTEGER,
+    rrule TEXT,
+    description TEXT NOT NULL,
+    type TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_set_date ON events (set_id, date);
+CREATE INDEX IF NOT EXISTS events_set_month ON events (set_id, month);
+'''
+
+# Seconds a writer waits for another process's write transaction
+BUSY_TIMEOUT = 10.0
+
+
+class UnknownEventSet(KeyError):
+    """Raised for an event set id that does not exist"""
+
+    def __str__(self):
+        return f'Unknown event set {self.args[0]!r}'
+
+
+class EventStore:
+    """Event sets kept in a local SQLite database.
+
+    A set is created from a CSV once and gets a random id; events can then
+    be added and removed one at a time. Every change bumps the set's
+    version, so (id, version) identifies its contents for caching. Reads
+    for a calendar only fetch the dated events in the years being rendered,
+    through the (set_id, date) index. max_events caps the size of a set.
+    """
+
+    def __init__(self, path, max_events=None):
+        self.path = path
+        self.max_events = max_events
+        self._ready = False
+        self._init_lock = threading.Lock()
+
+    def create(self, source):
+        """Store the events of a CSV source as a new set and return its info"""
+        records = self._parse(source, self.max_events)
+        set_id = secrets.token_urlsafe(12)
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute('INSERT INTO event_sets (id, version, created, updated) VALUES (?, 1, ?, ?)',
+                         (set_id, now, now))
+            self._insert(conn, set_id, records)
+            return self._info(conn, set_id)
+
+    def add(self, set_id, source):
+        """Append the events of a CSV source to a set and return its info"""
+        # Parse before taking the write lock
+        records = self._parse(source, self.max_events)
+        with self._transaction() as conn:
+            count = self._count(conn, set_id)
+            if self.max_events is not None and count + len(records) > self.max_events:
+                raise EventLimitError(self.max_events)
+            self._insert(conn, set_id, records)
+            self._bump(conn, set_id)
+            return self._info(conn, set_id)
+
+    def remove(self, set_id, event_id):
+        """Delete one event from a set and return the set's info"""
+        with self._transaction() as conn:
+            self._count(conn, set_id)
+            deleted = conn.execute('DELETE FROM events WHERE set_id = ? AND id = ?', (set_id, event_id))
+            if not deleted.rowcount:
+                raise KeyError(event_id)
+            self._bump(conn, set_id)
+            return self._info(conn, set_id)
+
+    def delete(self, set_id):
+        with self._transaction() as conn:
+            if not conn.execute('DELETE FROM event_sets WHERE id = ?', (set_id,)).rowcount:
+                raise UnknownEventSet(set_id)
+
+    def info(self, set_id):
+        with self._transaction(write=False) as conn:
+            return self._info(conn, set_id)
+
+    def list_events(self, set_id):
+        """Every event in a set, in the order it was added"""
+        with self._transaction(write=False) as conn:
+            self._count(conn, set_id)
+            rows = conn.execute(
+                'SELECT id, date, month, day, rrule, description, type FROM events '
+                'WHERE set_id = ? ORDER BY id', (set_id,))
+            return [{
+                'id': event_id,
+                'date': event_date or f'{month:02d}-{day:02d}',
+                'event': description,
+                'type': event_type,
+                'rrule': rrule,
+            } for event_id, event_date, month, day, rrule, description, event_type in rows]
+
+    def rows_for_years(self, set_id, years):
+        """Return (version, rows) with only the events that can fall in years.
+
+        Rows are (date, event, type, rrule) tuples as accepted by
+        DynamicCalendarGenerator.load_events. The version and rows are read
+        in one transaction so they always match.
+        """
+        first, last = f'{min(years):04d}-01-01', f'{max(years):04d}-12-31'
+        with self._transaction(write=False) as conn:
+            version = self._info(conn, set_id)['version']
+            recurring = conn.execute(
+                'SELECT month, day, description, type FROM events '
+                'WHERE set_id = ? AND month IS NOT NULL ORDER BY id', (set_id,))
+            rows = [(f'{month:02d}-{day:02d}', description, event_type, None)
+                    for month, day, description, event_type in recurring]
+            dated = conn.execute(
+                'SELECT date, description, type, rrule FROM events '
+                'WHERE set_id = ? AND date BETWEEN ? AND ? AND rrule IS NULL ORDER BY id',
+                (set_id, first, last))
+            rows.extend(dated)
+            # Rules that start before the range ends may still repeat into it
+            rules = conn.execute(
+                'SELECT date, description, type, rrule FROM events '
+                'WHERE set_id = ? AND date <= ? AND rrule IS NOT NULL ORDER BY id',
+                (set_id, last))
+            rows.extend(rules)
+        return version, rows
+
+    @staticmethod
+    def _parse(source, max_rows):
+        """Validate a CSV source into event rows, rejecting any malformed row"""
+        errors = []
+        records = []
+        for key, event in iter_events(source, errors=errors, max_rows=max_rows):
+            if isinstance(key, tuple):  # MM-DD format
+                records.append((None, key[0], key[1], None, event.description, event.type))
+            elif isinstance(key, Recurrence):  # RRULE recurrence
+                records.append((key.start.isoformat(), None, None, key.rule, event.description, event.type))
+            else:  # YYYY-MM-DD format
+                records.append((key.isoformat(), None, None, None, event.description, event.type))
+        if errors:
+            raise EventLoadError(errors)
+        return records
+
+    @staticmethod
+    def _insert(conn, set_id, records):
+        conn.executemany(
+            'INSERT INTO events (set_id, date, month, day, rrule, description, type) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)', [(set_id,) + record for record in records])
+
+    @staticmethod
+    def _bump(conn, set_id):
+        conn.execute('UPDATE event_sets SET version = version + 1, updated = ? WHERE id = ?',
+                     (time.time(), set_id))
+
+    @staticmethod
+    def _count(conn, set_id):
+        """Number of events in a set, raising UnknownEventSet if it is missing"""
+        if conn.execute('SELECT 1 FROM event_sets WHERE id = ?', (set_id,)).fetchone() is None:
+            raise UnknownEventSet(set_id)
+        return conn.execute('SELECT COUNT(*) FROM events WHERE set_id = ?', (set_id,)).fetchone()[0]
+
+    @staticmethod
+    def _info(conn, set_id):
+        row = conn.execute('SELECT version, created, updated FROM event_sets WHERE id = ?', (set_id,)).fetchone()
+        if row is None:
+            raise UnknownEventSet(set_id)
+        version, created, updated = row
+        count = conn.execute('SELECT COUNT(*) FROM events WHERE set_id = ?', (set_id,)).fetchone()[0]
+        return {'id': set_id, 'version': version, 'events': count, 'created': created, 'updated': updated}
+
+    @contextmanager
+    def _transaction(self, write=True):
+        """One connection per call, so threads and forked workers never share one"""
+        self._ensure_schema()
+        conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT, isolation_level=None)
+        try:
+            conn.execute('PRAGMA foreign_keys = ON')
+            conn.execute('BEGIN IMMEDIATE' if write else 'BEGIN')
+            try:
+                yield conn
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+            conn.execute('COMMIT')
+        finally:
+            conn.close()
+
+    def _ensure_schema(self):
+        if self._ready:
+            return
+        with self._init_lock:
+            if self._ready:
+                return
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT)
+            try:
+                # WAL lets renders read while another worker writes
+                conn.execute('PRAGMA journal_mode = WAL')
+                conn.executescript(SCHEMA)
+            finally:
+                conn.close()
+            self._ready = True
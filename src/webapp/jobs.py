@@ -0,0 +1,198 @@
+import io
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from src.calendargen.parallel import process_context
+
+
+class JobQueueFull(Exception):
+    """Raised when too many jobs are already queued or running"""
+
+
+class JobTimeout(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, key, year, pages, profile=None):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.year = year
+        self.pages = pages
+        self.profile = profile
+        self.status = 'queued'
+        self.error = None
+        self.result = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+
+    def to_dict(self):
+        info = {
+            'job_id': self.id,
+            'status': self.status,
+            'year': self.year,
+            'pages': len(self.pages),
+            'profile': self.profile,
+            'created': self.created,
+            'started': self.started,
+            'finished': self.finished,
+        }
+        if self.error:
+            info['error'] = self.error
+        if self.result is not None:
+            info['size'] = len(self.result)
+        return info
+
+
+def _generator_state(calendar_gen):
+    """Picklable inputs to rebuild calendar_gen in a child process"""
+    return (calendar_gen.styling, calendar_gen.recurring_events, calendar_gen.specific_events,
+            calendar_gen.rule_events)
+
+
+def _render_child(conn, state, pages):
+    """Child process entry point: render and send back bytes or an error"""
+    try:
+        from src.calendargen.generator import DynamicCalendarGenerator
+
+        styling, recurring, specific, rules = state
+        calendar_gen = DynamicCalendarGenerator(styling)
+        calendar_gen.recurring_events = recurring
+        calendar_gen.specific_events = specific
+        calendar_gen.rule_events = rules
+        buffer = io.BytesIO()
+        calendar_gen.render_pages(pages, buffer)
+        conn.send(('done', buffer.getvalue()))
+    except Exception as e:
+        conn.send(('failed', str(e)))
+    finally:
+        conn.close()
+
+
+def render_in_process(calendar_gen, pages, timeout):
+    """Render (year, month) pages in a child process, killing it if it exceeds timeout seconds"""
+    context = process_context()
+    parent_conn, child_conn = context.Pipe(duplex=False)
+    process = context.Process(target=_render_child, args=(child_conn, _generator_state(calendar_gen), pages))
+    process.start()
+    child_conn.close()
+    try:
+        if not parent_conn.poll(timeout):
+            raise JobTimeout(f'Rendering exceeded {timeout:.1f}s')
+        status, payload = parent_conn.recv()
+    except EOFError:
+        status, payload = 'failed', 'Render process exited unexpectedly'
+    finally:
+        parent_conn.close()
+        if process.is_alive():
+            process.terminate()
+        process.join()
+
+    if status != 'done':
+        raise RuntimeError(payload)
+    return payload
+
+
+class JobManager:
+    """Bounded in-process queue of calendar render jobs.
+
+    Each job runs in its own child process so it can be stopped on timeout.
+    Finished jobs are kept for result_ttl seconds, then dropped; beyond
+    max_results finished jobs or max_result_bytes of results the oldest
+    are dropped early.
+    """
+
+    def __init__(self, workers=2, max_queue=32, timeout=120, result_ttl=600, cache=None,
+                 max_results=256, max_result_bytes=128 * 1024 * 1024):
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.result_ttl = result_ttl
+        self.max_results = max_results
+        self.max_result_bytes = max_result_bytes
+        self.cache = cache
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='calendar-job')
+        self._jobs = {}
+        self._active_by_key = {}
+        self._lock = threading.Lock()
+
+    def submit(self, key, calendar_gen, year, pages=None):
+        """Queue a render of pages (default: all of year), reusing a live job for identical inputs"""
+        with self._lock:
+            self._expire()
+            existing = self._active_by_key.get(key)
+            if existing is not None and existing.status in ('queued', 'running', 'done'):
+                return existing
+
+            pending = sum(1 for job in self._jobs.values() if job.status in ('queued', 'running'))
+            if pending >= self.max_queue:
+                raise JobQueueFull(f'{pending} jobs already pending')
+
+            job = Job(key, year, pages or [(year, month) for month in range(1, 13)],
+                      calendar_gen.output_profile)
+            self._jobs[job.id] = job
+            self._active_by_key[key] = job
+
+        self._executor.submit(self._run, job, calendar_gen)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            self._expire()
+            return self._jobs.get(job_id)
+
+    def stats(self):
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+            result_bytes = sum(len(job.result) for job in self._jobs.values() if job.result is not None)
+            return {'jobs': len(self._jobs), 'max_queue': self.max_queue, 'by_status': counts,
+                    'result_bytes': result_bytes}
+
+    def _run(self, job, calendar_gen):
+        job.status = 'running'
+        job.started = time.time()
+        try:
+            result = self.cache.get(job.key) if self.cache is not None else None
+            if result is None:
+                # Measure the timeout from submission so queued time counts too
+                remaining = self.timeout - (job.started - job.created)
+                if remaining <= 0:
+                    raise JobTimeout('Job expired while queued')
+                result = render_in_process(calendar_gen, job.pages, remaining)
+                if self.cache is not None:
+                    self.cache.put(job.key, result)
+            job.result = result
+            job.status = 'done'
+        except JobTimeout as e:
+            job.error = str(e)
+            job.status = 'timeout'
+        except Exception as e:
+            job.error = str(e)
+            job.status = 'failed'
+        finally:
+            with self._lock:
+                job.finished = time.time()
+                self._expire()
+
+    def _expire(self):
+        # Caller holds the lock
+        now = time.time()
+        finished = sorted((job for job in self._jobs.values() if job.finished is not None),
+                          key=lambda job: job.finished)
+        expired = [job.id for job in finished if now - job.finished > self.result_ttl]
+        retained = finished[len(expired):]
+        retained_bytes = sum(len(job.result) for job in retained if job.result is not None)
+        # Oldest results go first once too many are held
+        while retained and (len(retained) > self.max_results or retained_bytes > self.max_result_bytes):
+            job = retained.pop(0)
+            expired.append(job.id)
+            if job.result is not None:
+                retained_bytes -= len(job.result)
+        for job_id in expired:
+            job = self._jobs.pop(job_id)
+            if self._active_by_key.get(job.key) is job:
+                del self._active_by_key[job.key]
@@ -0,0 +1,144 @@
+import hashlib
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: coalesce within the process only
+    fcntl = None
+
+# How often a waiting process retries a held lock file
+LOCK_POLL_INTERVAL = 0.02
+
+
+class SingleFlightTimeout(Exception):
+    """Raised to a follower when the render it waited on takes too long"""
+
+
+class _Flight:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Runs one call per key at a time and shares its result.
+
+    Threads asking for a key that is already being computed wait for the
+    leader and get the same result (or exception). A leader calls recheck()
+    before func(), so a result the previous leader stored (in the render
+    cache) just after this caller missed it is reused rather than computed
+    again. With lock_dir, leaders in different processes also take a file
+    lock for the key first, so recheck() sees what the previous holder
+    stored in a shared place (the render cache's disk tier). Lock files are
+    striped over lock_stripes names so the directory stays bounded.
+    """
+
+    def __init__(self, timeout=120.0, lock_dir=None, lock_stripes=256):
+        self.timeout = timeout
+        self.lock_dir = lock_dir if fcntl is not None else None
+        self.lock_stripes = lock_stripes
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.coalesced = 0
+        self.process_coalesced = 0
+        self.rechecked = 0
+        self.timeouts = 0
+
+        if self.lock_dir:
+            os.makedirs(self.lock_dir, exist_ok=True)
+
+    def do(self, key, func, recheck=None):
+        """Return func() for key, sharing one call among concurrent callers"""
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.leaders += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            if not flight.done.wait(self.timeout):
+                with self._lock:
+                    self.timeouts += 1
+                raise SingleFlightTimeout(f'Identical render still running after {self.timeout:.1f}s')
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = self._lead(key, func, recheck)
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        return flight.result
+
+    def stats(self):
+        with self._lock:
+            return {
+                'in_flight': len(self._flights),
+                'leaders': self.leaders,
+                'coalesced': self.coalesced,
+                'process_coalesced': self.process_coalesced,
+                'rechecked': self.rechecked,
+                'timeouts': self.timeouts,
+                'cross_process': bool(self.lock_dir),
+            }
+
+    def _lead(self, key, func, recheck):
+        if not self.lock_dir:
+            return self._run(func, recheck, locked=False)
+        with self._file_lock(key):
+            return self._run(func, recheck, locked=True)
+
+    def _run(self, func, recheck, locked):
+        """recheck()'s result when it has one, otherwise func()"""
+        result = recheck() if recheck is not None else None
+        if result is None:
+            return func()
+        with self._lock:
+            if locked:
+                self.process_coalesced += 1
+            else:
+                self.rechecked += 1
+        return result
+
+    @contextmanager
+    def _file_lock(self, key):
+        """Hold the key's lock file, or give up after timeout and run unlocked"""
+        stripe = int(hashlib.sha1(key.encode('utf-8')).hexdigest()[:8], 16) % self.lock_stripes
+        try:
+            fd = os.open(os.path.join(self.lock_dir, f'render-{stripe:03d}.lock'), os.O_RDWR | os.O_CREAT, 0o644)
+        except OSError:
+            yield False
+            return
+
+        locked = False
+        try:
+            deadline = time.monotonic() + self.timeout
+            while True:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    locked = True
+                    break
+                except BlockingIOError:
+                    if time.monotonic() >= deadline:
+                        break
+                    time.sleep(LOCK_POLL_INTERVAL)
+            yield locked
+        finally:
+            if locked:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
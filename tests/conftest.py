@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Tests import the package the way the web app does, as src.calendargen
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
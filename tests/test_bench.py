@@ -0,0 +1,52 @@
+import argparse
+import io
+import json
+
+from src.calendargen import bench
+from src.calendargen.bench import DEFAULT_BASELINE, STAGE_FUNCTIONS, compare, load_baseline
+
+
+def test_bundled_baseline_covers_quick_run():
+    profile, timings = load_baseline(DEFAULT_BASELINE)
+    assert profile['quick'] is True
+    stages = {name.split('/')[0] for name in timings}
+    assert stages == set(STAGE_FUNCTIONS)
+    assert all(seconds > 0 for seconds in timings.values())
+
+
+def test_flat_baseline_files_still_load(tmp_path):
+    path = tmp_path / 'old.json'
+    path.write_text(json.dumps({'load/sparse/1000': 0.01}))
+    assert load_baseline(str(path)) == ({}, {'load/sparse/1000': 0.01})
+
+
+def test_compare_flags_only_slowdowns_past_threshold():
+    baseline = {'a': 1.0, 'b': 1.0}
+    assert compare({'a': 1.2, 'b': 1.3, 'c': 9.0}, baseline, 0.25) == [('b', 1.0, 1.3)]
+
+
+def test_compare_ignores_benchmarks_below_the_noise_floor():
+    baseline = {'tiny': 0.00006, 'big': 0.01}
+    assert compare({'tiny': 0.001, 'big': 0.02}, baseline, 0.25) == [('big', 0.01, 0.02)]
+
+
+def run_main(tmp_path, profile):
+    path = tmp_path / 'baseline.json'
+    # Far faster than any real run, so every load benchmark regresses
+    path.write_text(json.dumps({'profile': profile, 'results': {'load/sparse/1000': 0.001}}))
+    args = argparse.Namespace(stages='load', repeat=1, quick=True, baseline=str(path),
+                              save_baseline=None, threshold=0.25)
+    out = io.StringIO()
+    return bench.main(args, out=out), out.getvalue()
+
+
+def test_threshold_is_enforced_on_the_recorded_machine(tmp_path):
+    status, output = run_main(tmp_path, bench.machine_profile(True, 1))
+    assert status == 1 and 'REGRESSION load/sparse/1000' in output
+
+
+def test_threshold_is_not_enforced_on_another_machine(tmp_path):
+    profile = dict(bench.machine_profile(True, 1), cpus=1024)
+    status, output = run_main(tmp_path, profile)
+    assert status == 0
+    assert 'cpus=1024' in output and 'not enforced' in output and 'REGRESSION' not in output
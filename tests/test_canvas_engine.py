@@ -0,0 +1,114 @@
+import io
+import itertools
+
+import pytest
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.platypus import Paragraph
+
+from src.calendargen.canvas_engine import description_lines, paragraph_text, wrap_text
+from src.calendargen.generator import DynamicCalendarGenerator
+
+pypdf = pytest.importorskip('pypdf')
+
+EVENTS = [
+    'date,event,type',
+    '03-05,Dentist,birthday',
+    '03-17,Parade day with a rather long description that wraps,other',
+    '03-17,Supercalifragilisticexpialidocious,other',
+    # An empty description takes no lines in the cell
+    '03-21,,other',
+    '03-21,After the empty one,other',
+    # Descriptions are Paragraph markup
+    '03-12,Tom &amp; Jerry,other',
+    '03-13,First line<br/>second line,other',
+    '2024-03-28,Trip,anniversary',
+]
+
+
+def text_runs(engine, styling):
+    """(text, x, y) of every text run on the first page, to 0.1pt"""
+    calendar_gen = DynamicCalendarGenerator(dict(styling, engine=engine, holidays='us', output_profile='fast'))
+    calendar_gen.load_events(EVENTS, years=(2024,))
+    buffer = io.BytesIO()
+    calendar_gen.generate_calendar(2024, buffer, months=[3])
+
+    runs = []
+
+    def visit(text, cm, tm, font_dict, font_size):
+        # Older pypdf also reports a form XObject's text joined by newlines,
+        # which no single drawn string contains
+        if text.strip() and '\n' not in text.strip():
+            x = tm[4] * cm[0] + tm[5] * cm[2] + cm[4]
+            y = tm[4] * cm[1] + tm[5] * cm[3] + cm[5]
+            runs.append((text.strip(), round(x, 1), round(y, 1)))
+
+    pypdf.PdfReader(buffer).pages[0].extract_text(visitor_text=visit)
+    return sorted(runs)
+
+
+@pytest.mark.parametrize('paper_size, orientation, weekstart', list(itertools.product(
+    ['A4', 'Letter', 'Legal'], ['P', 'L'], ['0', '6'])))
+def test_canvas_layout_matches_platypus(paper_size, orientation, weekstart):
+    styling = {'paper_size': paper_size, 'orientation': orientation, 'weekstart': weekstart}
+    platypus_runs = text_runs('platypus', styling)
+    assert platypus_runs
+    assert text_runs('canvas', styling) == platypus_runs
+
+
+def paragraph_lines(text, font_size, width):
+    paragraph = Paragraph(text, ParagraphStyle('t', fontName='Helvetica', fontSize=font_size))
+    paragraph.wrap(width, 1e6)
+    if paragraph.blPara.kind == 0:
+        return [' '.join(words) for _, words in paragraph.blPara.lines]
+    # Markup lines hold fragments, which keep their own spaces
+    return [''.join(frag.text for frag in line.words).strip() for line in paragraph.blPara.lines]
+
+
+@pytest.mark.parametrize('text, width', [
+    ('Supercalifragilisticexpialidocious', 40),
+    ('Call Supercalifragilisticexpialidocious now', 60),
+    ('a bb ccc dddd eeeee ffffff', 30),
+    ('Parade day with a rather long description that wraps', 70),
+    ('x' * 20, 3),
+    ('ab ' + 'x' * 5, 3),
+    ('WWW', 5),
+])
+def test_wrap_text_matches_paragraph(text, width):
+    assert wrap_text(text, 'Helvetica', 10, width) == paragraph_lines(text, 10, width)
+
+
+@pytest.mark.parametrize('text', ['', '   '])
+def test_wrap_text_empty_description(text):
+    assert wrap_text(text, 'Helvetica', 10, 50) == []
+
+
+@pytest.mark.parametrize('text', [
+    'Tom &amp; Jerry',
+    'a<br/>b',
+    'a<br/><br/>b',
+    'a<br/>',
+    '<br/>a',
+    '<br/>',
+    'Rather long first line<br/>and a second',
+])
+def test_description_lines_match_paragraph(text):
+    assert description_lines(text, 'Helvetica', 10, 60) == paragraph_lines(text, 10, 60)
+
+
+def test_markup_tags_are_dropped():
+    assert paragraph_text('<b>Bold</b> day') == ('Bold day',)
+    assert paragraph_text('<font color="red">R</font>&lt;3') == ('R<3',)
+    with pytest.raises(ValueError):
+        paragraph_text('<b>unclosed')
+
+
+def test_svg_preview_shows_markup_as_text():
+    from src.calendargen.preview import SvgPreview
+
+    calendar_gen = DynamicCalendarGenerator({'engine': 'canvas'})
+    calendar_gen.load_events(['date,event,type', '03-12,Tom &amp; Jerry,other', '03-13,<b>Bold</b> day,other'],
+                             years=(2024,))
+    svg = SvgPreview(calendar_gen).render(2024, 3)
+    assert '>Tom &amp; Jerry</text>' in svg
+    assert '>Bold day</text>' in svg
+    assert '&lt;b&gt;' not in svg
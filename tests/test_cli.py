@@ -0,0 +1,44 @@
+import io
+
+import pytest
+
+from src.calendargen.cli import load_manifest, run_batch
+
+
+def write_manifest(tmp_path, text):
+    path = tmp_path / 'jobs.csv'
+    path.write_text(text)
+    return str(path)
+
+
+def test_csv_styling_columns_are_typed(tmp_path):
+    path = write_manifest(tmp_path, 'year,output,compact_mode,show_weekends,header_size,grid_width\n'
+                                    '2025,a.pdf,false,False,20,0.75\n'
+                                    '2025,b.pdf,TRUE,on,,\n')
+    first, second = load_manifest(path)
+    assert first['styling'] == {'compact_mode': False, 'show_weekends': False,
+                                'header_size': 20, 'grid_width': 0.75}
+    assert second['styling'] == {'compact_mode': True, 'show_weekends': True}
+
+
+def test_bad_boolean_names_the_entry(tmp_path):
+    path = write_manifest(tmp_path, 'year,output,compact_mode\n2025,a.pdf,maybe\n')
+    with pytest.raises(ValueError, match='entry 1: compact_mode'):
+        load_manifest(path)
+
+
+def test_bad_events_file_fails_only_its_jobs(tmp_path):
+    (tmp_path / 'good.csv').write_text('date,event,type\n2025-03-01,Launch,work\n')
+    path = write_manifest(tmp_path, 'year,output,events\n'
+                                    '2025,good.pdf,good.csv\n'
+                                    '2025,missing.pdf,missing.csv\n'
+                                    '2025,plain.pdf,\n')
+    out = io.StringIO()
+    failures = run_batch(load_manifest(path), workers=1, out=out)
+
+    assert failures == 1
+    lines = out.getvalue().splitlines()
+    assert lines[0].startswith('[1] ') and 'good.pdf' in lines[0]
+    assert lines[1].startswith('[2] FAILED') and 'missing.csv' in lines[1]
+    assert lines[2].startswith('[3] ') and 'plain.pdf' in lines[2]
+    assert (tmp_path / 'good.pdf').exists() and (tmp_path / 'plain.pdf').exists()
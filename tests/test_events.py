@@ -0,0 +1,31 @@
+import io
+
+from src.calendargen.events import iter_events
+from src.calendargen.generator import DynamicCalendarGenerator
+
+CSV = 'date,event,type\n03-05,Dentist,birthday\n2024-03-28,Trip,anniversary\n'
+
+
+def test_binary_stream_is_left_open():
+    stream = io.BytesIO(('\ufeff' + CSV).encode('utf-8'))
+    events = list(iter_events(stream))
+    assert [event.description for _, event in events] == ['Dentist', 'Trip']
+    assert not stream.closed
+
+
+def test_binary_stream_stays_open_after_load_events():
+    stream = io.BytesIO(CSV.encode('utf-8'))
+    calendar_gen = DynamicCalendarGenerator()
+    calendar_gen.load_events(stream, years=(2024,))
+    del calendar_gen
+    assert not stream.closed
+    stream.seek(0)
+    assert stream.read().startswith(b'date,')
+
+
+def test_binary_stream_stays_open_when_reading_stops_early():
+    stream = io.BytesIO(CSV.encode('utf-8'))
+    rows = iter_events(stream)
+    next(rows)
+    rows.close()
+    assert not stream.closed
@@ -0,0 +1,153 @@
+import sqlite3
+
+import pytest
+
+from src.calendargen.events import EventLimitError, EventLoadError
+from src.webapp.eventstore import EventStore, UnknownEventSet
+
+HEADER = 'date,event,type,rrule'
+ROWS = [
+    '2023-05-01,Last year,other,',
+    '2024-05-01,This year,other,',
+    '2025-05-01,Next year,other,',
+    '03-05,Birthday,birthday,',
+    '2020-01-06,Weekly since 2020,other,FREQ=WEEKLY',
+    '2026-01-01,Rule starting later,other,FREQ=YEARLY',
+]
+
+
+@pytest.fixture
+def store(tmp_path):
+    return EventStore(str(tmp_path / 'events.sqlite3'))
+
+
+def set_count(store):
+    """Stored sets; uploads rejected while parsing never create the schema"""
+    conn = sqlite3.connect(store.path)
+    try:
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'event_sets'").fetchone() is None:
+            return 0
+        return conn.execute('SELECT COUNT(*) FROM event_sets').fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_round_trip_bumps_version_and_filters_by_year(store):
+    info = store.create([HEADER] + ROWS)
+    set_id = info['id']
+    assert info['version'] == 1 and info['events'] == len(ROWS)
+
+    info = store.add(set_id, [HEADER, '2024-07-04,Added,holiday,'])
+    assert info['version'] == 2 and info['events'] == len(ROWS) + 1
+
+    items = store.list_events(set_id)
+    assert [item['event'] for item in items][-1] == 'Added'
+    removed = next(item for item in items if item['event'] == 'This year')
+    info = store.remove(set_id, removed['id'])
+    assert info['version'] == 3 and info['events'] == len(ROWS)
+
+    version, rows = store.rows_for_years(set_id, {2024})
+    assert version == 3
+    assert rows == [
+        ('03-05', 'Birthday', 'birthday', None),
+        ('2024-07-04', 'Added', 'holiday', None),
+        ('2020-01-06', 'Weekly since 2020', 'other', 'FREQ=WEEKLY'),
+    ]
+
+
+def test_unknown_event_leaves_version_unchanged(store):
+    set_id = store.create([HEADER] + ROWS)['id']
+    with pytest.raises(KeyError):
+        store.remove(set_id, 10_000)
+    assert store.info(set_id)['version'] == 1
+
+
+def test_malformed_rows_reject_the_whole_upload(store):
+    with pytest.raises(EventLoadError, match='line 3'):
+        store.create([HEADER, '2024-01-01,Fine,other,', '2024-13-01,Bad month,other,'])
+    assert set_count(store) == 0
+
+    set_id = store.create([HEADER] + ROWS)['id']
+    with pytest.raises(EventLoadError, match='invalid recurrence rule'):
+        store.add(set_id, [HEADER, '2024-01-01,Loop,other,FREQ=DAILY;INTERVAL=0'])
+    assert store.info(set_id)['version'] == 1
+
+
+def test_max_events_caps_create_and_add(tmp_path):
+    store = EventStore(str(tmp_path / 'events.sqlite3'), max_events=3)
+    with pytest.raises(EventLimitError):
+        store.create([HEADER] + ROWS[:4])
+    assert set_count(store) == 0
+
+    set_id = store.create([HEADER] + ROWS[:2])['id']
+    store.add(set_id, [HEADER, ROWS[2]])
+    with pytest.raises(EventLimitError):
+        store.add(set_id, [HEADER, ROWS[3]])
+    info = store.info(set_id)
+    assert info['events'] == 3 and info['version'] == 2
+
+
+def test_unknown_set_raises(store):
+    for call in (lambda: store.info('missing'), lambda: store.list_events('missing'),
+                 lambda: store.rows_for_years('missing', {2024}), lambda: store.delete('missing'),
+                 lambda: store.add('missing', [HEADER, ROWS[0]]), lambda: store.remove('missing', 1)):
+        with pytest.raises(UnknownEventSet):
+            call()
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    from src.webapp import app as app_module
+
+    monkeypatch.setattr(app_module, 'event_store', EventStore(str(tmp_path / 'events.sqlite3'), max_events=10))
+    return app_module.app.test_client()
+
+
+def test_events_routes_round_trip(client):
+    response = client.post('/events', data={'csv_text': '\n'.join([HEADER] + ROWS)})
+    assert response.status_code == 201
+    info = response.get_json()
+    assert info['version'] == 1 and info['url'] == f'/events/{info["id"]}'
+
+    response = client.post(info['url'], data={'csv_text': f'{HEADER}\n2024-07-04,Added,holiday,'})
+    assert response.status_code == 200 and response.get_json()['version'] == 2
+
+    items = client.get(info['url']).get_json()['items']
+    assert len(items) == len(ROWS) + 1
+    response = client.delete(f'{info["url"]}/{items[0]["id"]}')
+    assert response.status_code == 200 and response.get_json()['version'] == 3
+
+    response = client.post('/', data={'year': '2024', 'event_set': info['id']})
+    assert response.status_code == 200 and response.data.startswith(b'%PDF-')
+
+    assert client.delete(info['url']).status_code == 204
+    assert client.get(info['url']).status_code == 404
+
+
+def test_events_routes_reject_bad_uploads(client):
+    response = client.post('/events', data={'csv_text': f'{HEADER}\nnot a date,Bad,other,'})
+    assert response.status_code == 400 and 'line 2' in response.get_json()['error']
+    assert client.post('/events', data={}).status_code == 400
+
+    too_many = '\n'.join([HEADER] + [f'2024-01-{day:02d},Day {day},other,' for day in range(1, 12)])
+    response = client.post('/events', data={'csv_text': too_many})
+    assert response.status_code == 400 and 'Too many events' in response.get_json()['error']
+
+
+@pytest.mark.parametrize('method, path', [
+    ('get', '/events/missing'),
+    ('post', '/events/missing'),
+    ('delete', '/events/missing'),
+    ('delete', '/events/missing/1'),
+])
+def test_unknown_set_is_404(client, method, path):
+    data = {'csv_text': f'{HEADER}\n{ROWS[0]}'} if method == 'post' else None
+    response = getattr(client, method)(path, data=data)
+    assert response.status_code == 404
+    assert 'missing' in response.get_json()['error']
+
+
+def test_unknown_event_is_404(client):
+    info = client.post('/events', data={'csv_text': '\n'.join([HEADER] + ROWS)}).get_json()
+    response = client.delete(f'{info["url"]}/10000')
+    assert response.status_code == 404
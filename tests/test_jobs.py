@@ -0,0 +1,49 @@
+import time
+
+from src.calendargen.cache import RenderCache
+from src.webapp.jobs import JobManager
+
+
+class StubGenerator:
+    output_profile = 'standard'
+
+
+def wait_for(manager, job, timeout=60):
+    deadline = time.monotonic() + timeout
+    while job.finished is None and time.monotonic() < deadline:
+        time.sleep(0.02)
+    return manager.get(job.id)
+
+
+def test_job_renders_in_child_process():
+    from src.calendargen.generator import DynamicCalendarGenerator
+
+    calendar_gen = DynamicCalendarGenerator({'holidays': 'us'})
+    calendar_gen.load_events(['date,event,type', '03-17,Parade,other'], years=(2024,))
+    manager = JobManager(workers=1, timeout=60)
+    job = wait_for(manager, manager.submit('key', calendar_gen, 2024, [(2024, 3)]))
+    assert job.status == 'done', job.error
+    assert job.result.startswith(b'%PDF')
+
+
+def run_cached_jobs(manager, count, size):
+    jobs = []
+    for n in range(count):
+        manager.cache.put(f'key-{n}', bytes(size))
+        jobs.append(wait_for(manager, manager.submit(f'key-{n}', StubGenerator(), 2024)))
+    return jobs
+
+
+def test_finished_results_are_capped_by_count():
+    manager = JobManager(workers=1, cache=RenderCache(max_entries=16), max_results=2)
+    jobs = run_cached_jobs(manager, 5, 10)
+    assert manager.stats()['jobs'] == 2
+    assert [manager.get(job.id) is not None for job in jobs] == [False, False, False, True, True]
+
+
+def test_finished_results_are_capped_by_bytes():
+    manager = JobManager(workers=1, cache=RenderCache(max_entries=16), max_result_bytes=250)
+    jobs = run_cached_jobs(manager, 5, 100)
+    assert manager.stats()['result_bytes'] <= 250
+    assert manager.get(jobs[-1].id) is not None
+    assert manager.get(jobs[0].id) is None
@@ -0,0 +1,50 @@
+import io
+
+import pytest
+
+from src.calendargen.generator import DynamicCalendarGenerator
+from src.calendargen.parallel import equivalent_output, shutdown_executor
+
+pytest.importorskip('pypdf')
+
+EVENTS = [
+    'date,event,type,rrule',
+    '01-01,New Year,holiday,',
+    '03-17,Parade day with a rather long description that wraps,other,',
+    '2024-06-14,Trip,anniversary,',
+    '2024-01-09,Book club,other,FREQ=MONTHLY;BYDAY=2TU',
+]
+
+STYLINGS = [
+    {},
+    {'weekstart': '6', 'orientation': 'L', 'paper_size': 'Letter'},
+    {'color_scheme': 'dark', 'compact_mode': True, 'show_weekends': False, 'holidays': 'uk'},
+    {'color_scheme': 'ocean', 'paper_size': 'Legal', 'output_profile': 'small', 'holidays': 'us,irish'},
+]
+
+
+@pytest.fixture(scope='module', autouse=True)
+def pool():
+    yield
+    shutdown_executor()
+
+
+def render(styling, workers):
+    calendar_gen = DynamicCalendarGenerator(styling)
+    calendar_gen.load_events(EVENTS, years=(2024,))
+    buffer = io.BytesIO()
+    calendar_gen.generate_calendar(2024, buffer, workers=workers)
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize('styling', STYLINGS)
+def test_parallel_output_matches_serial(styling):
+    assert equivalent_output(render(styling, None), render(styling, 2))
+
+
+def test_pool_and_jobs_share_one_process_context():
+    from src.calendargen import parallel
+    from src.webapp import jobs
+
+    assert jobs.process_context is parallel.process_context
+    assert parallel.process_context() is parallel.process_context()
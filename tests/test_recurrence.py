@@ -0,0 +1,129 @@
+import pickle
+import time
+from datetime import date, datetime
+
+import pytest
+from dateutil.rrule import rrulestr
+
+from src.calendargen.events import MAX_RULE_OCCURRENCES, EventLoadError, Recurrence, iter_events
+from src.calendargen.index import EventIndex
+
+REJECTED_RULES = [
+    'FREQ=DAILY;INTERVAL=0',
+    'FREQ=WEEKLY;INTERVAL=-1',
+    'FREQ=DAILY;INTERVAL=x',
+    'FREQ=HOURLY',
+    'FREQ=MINUTELY',
+    'FREQ=SECONDLY',
+    'FREQ=DAILY;BYHOUR=9,17',
+    'FREQ=DAILY;BYMONTH=2;BYMONTHDAY=30',
+    'FREQ=MONTHLY;BYDAY=6MO',
+    'FREQ=MONTHLY;INTERVAL=2;BYMONTH=2',
+    'FREQ=DAILY;INTERVAL=7;BYDAY=MO',
+    'FREQ=YEARLY;BYYEARDAY=367',
+    'FREQ=MONTHLY;BYMONTH=13',
+]
+
+
+def load(rows):
+    errors = []
+    events = list(iter_events(['date,event,type,rrule'] + rows, errors=errors))
+    return events, errors
+
+
+@pytest.mark.parametrize('rule', REJECTED_RULES)
+def test_unsafe_rules_are_malformed_rows(rule):
+    # 2024-01-02 is a Tuesday
+    events, errors = load([f'2024-01-02,Bad,other,{rule}', '2024-01-03,Good,other,FREQ=WEEKLY'])
+    assert [event.description for _, event in events] == ['Good']
+    assert len(errors) == 1
+    line, message = errors[0]
+    assert line == 2 and 'invalid recurrence rule' in message
+
+
+def test_strict_loading_rejects_zero_interval():
+    from src.calendargen.generator import DynamicCalendarGenerator
+
+    with pytest.raises(EventLoadError, match='INTERVAL'):
+        DynamicCalendarGenerator().load_events(
+            ['date,event,type,rrule', '2024-01-01,Loop,other,FREQ=DAILY;INTERVAL=0'], strict=True)
+
+
+@pytest.mark.parametrize('rule, expected', [
+    ('FREQ=MONTHLY;BYDAY=2TU', 12),
+    ('FREQ=MONTHLY;BYDAY=MO,TU,WE,TH,FR;BYSETPOS=-1', 12),
+    ('FREQ=YEARLY;BYMONTH=11;BYDAY=4TH', 1),
+    ('FREQ=DAILY;INTERVAL=7;BYDAY=TU', 52),
+    ('FREQ=WEEKLY;INTERVAL=3', 17),
+    ('FREQ=DAILY;COUNT=5', 5),
+])
+def test_supported_rules_expand(rule, expected):
+    recurrence = Recurrence(date(2025, 1, 1) if 'COUNT' in rule else date(2024, 1, 2), rule)
+    assert len(recurrence.between(date(2025, 1, 1), date(2025, 12, 31))) == expected
+
+
+def test_occurrences_are_capped_per_window():
+    recurrence = Recurrence(date(2020, 1, 1), 'FREQ=DAILY')
+    occurrences = recurrence.between(date(2020, 1, 1), date(2029, 12, 31))
+    assert len(occurrences) == MAX_RULE_OCCURRENCES
+    assert occurrences[0] == date(2020, 1, 1)
+
+
+def test_daily_rule_adds_one_event_per_day():
+    events, errors = load(['2024-01-01,Standup,other,FREQ=DAILY'])
+    assert not errors
+    rule, event = events[0]
+    index = EventIndex(2025, {}, {}, {}, {rule: [event]})
+    assert set(index.counts) == {1}
+
+
+def expand_quickly(recurrence, year=2024):
+    started = time.perf_counter()
+    dates = recurrence.between(date(year, 1, 1), date(year, 12, 31))
+    assert time.perf_counter() - started < 0.1
+    return dates
+
+
+def test_rule_started_centuries_back_expands_only_the_window():
+    dates = expand_quickly(Recurrence(date(1, 1, 1), 'FREQ=DAILY'))
+    assert len(dates) == 366 and dates[0] == date(2024, 1, 1)
+
+
+@pytest.mark.parametrize('rule', [
+    'FREQ=DAILY;BYMONTH=1;BYWEEKNO=20',
+    'FREQ=DAILY;BYYEARDAY=60;BYMONTH=3;BYMONTHDAY=5',
+])
+@pytest.mark.parametrize('start', [date(1, 1, 1), date(2024, 1, 1)])
+def test_rules_that_never_match_stop_at_the_window(rule, start):
+    assert expand_quickly(Recurrence(start, rule)) == []
+
+
+def test_count_rule_far_back_is_bounded():
+    recurrence = Recurrence(date(1, 1, 1), 'FREQ=DAILY;COUNT=3;BYMONTH=1;BYWEEKNO=20')
+    assert expand_quickly(recurrence) == []
+
+
+@pytest.mark.parametrize('start, rule', [
+    (date(1990, 1, 31), 'FREQ=MONTHLY;INTERVAL=5'),
+    (date(1993, 6, 2), 'FREQ=YEARLY;BYYEARDAY=1,-1'),
+    (date(1991, 8, 31), 'FREQ=YEARLY;INTERVAL=3;BYWEEKNO=1,20;BYDAY=MO'),
+    (date(1999, 12, 30), 'FREQ=WEEKLY;INTERVAL=5;WKST=SU;BYDAY=SA,SU'),
+    (date(2000, 2, 29), 'FREQ=YEARLY;INTERVAL=4'),
+    (date(2019, 3, 5), 'FREQ=DAILY;INTERVAL=9;BYMONTHDAY=1,2,3,4,5'),
+    (date(2023, 11, 7), 'FREQ=WEEKLY;COUNT=40;BYDAY=TU,TH'),
+])
+def test_aligned_expansion_matches_dateutil(start, rule):
+    expected = rrulestr(rule, dtstart=datetime.combine(start, datetime.min.time()))
+    for year in (2024, 2025, 2028):
+        window = expected.between(datetime(year, 1, 1), datetime(year, 12, 31), inc=True)
+        assert Recurrence(start, rule).between(date(year, 1, 1), date(year, 12, 31)) == [d.date() for d in window]
+
+
+def test_years_are_expanded_once_and_pickled():
+    recurrence = Recurrence(date(2020, 1, 6), 'FREQ=WEEKLY')
+    months = [recurrence.between(date(2024, month, 1), date(2024, month, 28)) for month in range(1, 13)]
+    assert sum(map(len, months)) == 48
+    assert list(recurrence._years) == [2024]
+
+    copy = pickle.loads(pickle.dumps(recurrence))
+    assert copy == recurrence and copy._years == recurrence._years
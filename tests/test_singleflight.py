@@ -0,0 +1,145 @@
+import threading
+import time
+
+import pytest
+
+from src.webapp.singleflight import SingleFlight, SingleFlightTimeout
+
+
+def wait_until(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.005)
+    assert condition()
+
+
+def start(target, *args):
+    """Run target in a thread, returning (thread, outcome list)"""
+    outcome = []
+
+    def run():
+        try:
+            outcome.append(('result', target(*args)))
+        except BaseException as e:
+            outcome.append(('error', e))
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread, outcome
+
+
+def blocking_call(release, value):
+    calls = []
+
+    def func():
+        calls.append(threading.current_thread().name)
+        release.wait(10)
+        if isinstance(value, BaseException):
+            raise value
+        return value
+
+    return func, calls
+
+
+def test_followers_share_the_leader_result():
+    flight = SingleFlight(timeout=10)
+    release = threading.Event()
+    func, calls = blocking_call(release, b'pdf')
+
+    leader, leader_outcome = start(flight.do, 'key', func)
+    wait_until(lambda: calls)
+    followers = [start(flight.do, 'key', func) for _ in range(4)]
+    wait_until(lambda: flight.stats()['coalesced'] == 4)
+    assert flight.stats()['in_flight'] == 1
+
+    release.set()
+    for thread, _ in [(leader, leader_outcome)] + followers:
+        thread.join(10)
+    assert len(calls) == 1
+    assert [leader_outcome] + [outcome for _, outcome in followers] == [[('result', b'pdf')]] * 5
+    stats = flight.stats()
+    assert stats['leaders'] == 1 and stats['in_flight'] == 0 and stats['timeouts'] == 0
+
+
+def test_leader_error_reaches_followers():
+    flight = SingleFlight(timeout=10)
+    release = threading.Event()
+    error = ValueError('bad render')
+    func, calls = blocking_call(release, error)
+
+    leader, leader_outcome = start(flight.do, 'key', func)
+    wait_until(lambda: calls)
+    follower, follower_outcome = start(flight.do, 'key', func)
+    wait_until(lambda: flight.stats()['coalesced'] == 1)
+    release.set()
+    leader.join(10)
+    follower.join(10)
+
+    assert leader_outcome == [('error', error)]
+    assert follower_outcome == [('error', error)]
+    # The failed flight is gone, so the next caller leads a new one
+    assert flight.do('key', lambda: b'retry') == b'retry'
+
+
+def test_follower_times_out_while_leader_continues():
+    flight = SingleFlight(timeout=0.05)
+    release = threading.Event()
+    func, calls = blocking_call(release, b'pdf')
+
+    leader, leader_outcome = start(flight.do, 'key', func)
+    wait_until(lambda: calls)
+    with pytest.raises(SingleFlightTimeout):
+        flight.do('key', func)
+    assert flight.stats()['timeouts'] == 1
+
+    release.set()
+    leader.join(10)
+    assert leader_outcome == [('result', b'pdf')]
+
+
+def test_leader_reuses_result_stored_after_the_caller_missed_it():
+    flight = SingleFlight(timeout=10)
+    cache = {}
+    renders = []
+
+    def render():
+        renders.append(1)
+        cache['key'] = b'pdf'
+        return b'pdf'
+
+    # A caller that missed the cache before the previous leader stored its result
+    assert flight.do('key', render, recheck=lambda: cache.get('key')) == b'pdf'
+    assert flight.do('key', render, recheck=lambda: cache.get('key')) == b'pdf'
+    assert len(renders) == 1
+    stats = flight.stats()
+    assert stats['leaders'] == 2 and stats['rechecked'] == 1 and stats['process_coalesced'] == 0
+
+
+def test_lock_dir_coalesces_leaders_of_separate_instances(tmp_path):
+    # Two instances stand in for two worker processes sharing a cache
+    first, second = SingleFlight(timeout=10, lock_dir=str(tmp_path)), SingleFlight(timeout=10, lock_dir=str(tmp_path))
+    cache = {}
+    release = threading.Event()
+    renders = []
+
+    def slow_render():
+        renders.append('first')
+        release.wait(10)
+        cache['key'] = b'pdf'
+        return b'pdf'
+
+    def render():
+        renders.append('second')
+        return b'other'
+
+    leader, leader_outcome = start(first.do, 'key', slow_render, lambda: cache.get('key'))
+    wait_until(lambda: renders)
+    waiter, waiter_outcome = start(second.do, 'key', render, lambda: cache.get('key'))
+    time.sleep(0.1)
+    release.set()
+    leader.join(10)
+    waiter.join(10)
+
+    assert renders == ['first']
+    assert leader_outcome == waiter_outcome == [('result', b'pdf')]
+    assert second.stats()['process_coalesced'] == 1 and second.stats()['cross_process']
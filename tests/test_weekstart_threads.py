@@ -0,0 +1,41 @@
+import calendar
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from src.calendargen.generator import DynamicCalendarGenerator
+
+HEADERS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+WEEK_STARTS = [0, 6, 2, 4]
+MONTHS = [(2023, 2), (2024, 2), (2024, 9), (2025, 6), (2026, 3)]
+
+
+def table_grid(week_start, year, month, barrier):
+    calendar_gen = DynamicCalendarGenerator({'weekstart': str(week_start)})
+    # Line up the threads so their calls overlap
+    barrier.wait()
+    table_data, _, _ = calendar_gen.create_month_table(year, month, 24, 10)
+    headers, weeks = table_data[0], table_data[1:]
+    grid = [[int(re.search(r'\d+', cell[0].text).group()) if cell else 0 for cell in week] for week in weeks]
+    return headers, grid
+
+
+def test_mixed_week_starts_from_many_threads():
+    rounds = [(week_start, year, month) for week_start in WEEK_STARTS for year, month in MONTHS]
+    cases = rounds * 4
+    # Each round of threads passes the barrier together
+    barrier = threading.Barrier(len(rounds))
+    with ThreadPoolExecutor(max_workers=len(rounds)) as executor:
+        futures = [executor.submit(table_grid, week_start, year, month, barrier)
+                   for week_start, year, month in cases]
+        results = [f.result(timeout=120) for f in futures]
+
+    for (week_start, year, month), (headers, grid) in zip(cases, results):
+        assert headers == HEADERS[week_start:] + HEADERS[:week_start]
+        assert grid == calendar.Calendar(week_start).monthdayscalendar(year, month)
+
+
+def test_global_first_weekday_is_untouched():
+    previous = calendar.firstweekday()
+    DynamicCalendarGenerator({'weekstart': '6'}).create_month_table(2024, 1, 24, 10)
+    assert calendar.firstweekday() == previous